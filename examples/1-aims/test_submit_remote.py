@@ -4,7 +4,7 @@ from pymatgen.io.ase import AseAtomsAdaptor
 import ase
 import numpy as np
 from gaims_geoopt.flows import MLIPAssistedGeoOptMaker
-from jobflow_remote import submit_flow, set_run_config
+from jobflow_remote import submit_flow
 from pathlib import Path
 
 molecule = Molecule.from_str(
@@ -64,14 +64,21 @@ parameters = {
 
 
 
+resource_mace = {"nodes": 1, "ntasks_per_node": 1, "cpus_per_task":20}
+resource_aims = {"nodes": 1, "ntasks_per_node": 28, "cpus_per_task":1}
+# Per-stage routing, carried through every iteration of the loop.
+stage_configs = {
+    "fit": {"worker": "precision_tower_worker_mace", "resources": resource_mace},
+    "relax": {"worker": "precision_tower_worker_mace", "resources": resource_mace},
+    "reference": {"worker": "precision_tower_worker_mace", "resources": resource_aims},
+    "bookkeeping": {"worker": "local_shell"},
+}
+
 fl = MLIPAssistedGeoOptMaker().make(molecule, database_dict, 0.05,
                                     machine_learning_fit_kwargs={"foundation_model":"small", "device":"cpu", "default_dtype":"float32", "enable_cueq":False, "max_num_epochs":300},
                                     relax_calculator_kwargs={"device":"cuda", "enable_cueq":False},
-                                    calculator = "aims", calculator_kwargs=parameters)
-
-resource_mace = {"nodes": 1, "ntasks_per_node": 1, "cpus_per_task":20}
-resource_aims = {"nodes": 1, "ntasks_per_node": 28, "cpus_per_task":1}
-fl = set_run_config(fl, name_filter="SCF Calculation", resources=resource_aims, worker="precision_tower_worker_mace")
+                                    calculator = "aims", calculator_kwargs=parameters,
+                                    stage_configs=stage_configs)
 
 # Run relax job remotely
 j_id = submit_flow(fl, project="yiy_workstation", resources=resource_mace, worker="precision_tower_worker_mace")
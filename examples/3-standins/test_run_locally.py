@@ -0,0 +1,41 @@
+from pymatgen.core import Molecule
+from jobflow import run_locally
+from ase.cluster import Icosahedron
+import json
+import time
+from gaims_geoopt.flows import MLIPAssistedGeoOptMaker
+
+# Analytic EMT reference + harmonic surrogate MLIP: runs in seconds on a CPU.
+cluster = Icosahedron("Cu", noshells=2)
+cluster.rattle(stdev=0.05, seed=42)
+molecule = Molecule.from_ase_atoms(cluster)
+
+database_dict = {
+    "train.extxyz": [],
+    "test.extxyz": [],
+}
+
+fl = MLIPAssistedGeoOptMaker().make(molecule, database_dict, 0.05,
+                                    calculator="EMT", mlip="harmonic")
+start = time.perf_counter()
+response = run_locally(fl, create_folders=False)
+wall_time = time.perf_counter() - start
+
+energies = []
+max_forces = []
+flow_now = fl
+while True:
+    if flow_now is None:
+        break
+    for job in flow_now:
+        if job.name=="EMT static":
+            energies.append(response[job.uuid][1].output.output.energy)
+        if job.name=="evaluate_max_force":
+            max_forces.append(response[job.uuid][1].output)
+    for job in flow_now:
+        if job.name=="check_convergence_and_next":
+            uuid_next = job.uuid
+    flow_now = response[uuid_next][1].replace
+data={"energies": energies, "max_forces": max_forces, "wall_time": wall_time}
+with open('gaims_geoopt_result.json', 'w', encoding='utf-8') as f:
+    json.dump(data, f, ensure_ascii=False, indent=4)
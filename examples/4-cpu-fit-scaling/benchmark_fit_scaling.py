@@ -0,0 +1,89 @@
+from pymatgen.core import Molecule
+from jobflow import run_locally
+from ase.cluster import Icosahedron
+from ase.calculators.emt import EMT
+import json
+import time
+from gaims_geoopt.jobs import machine_learning_fit_in_process, get_allocated_cores
+from gaims_geoopt.schedules import epochs_for_batch_size
+
+# Scaling of one MACE fine-tune over CPU core counts.  Run inside the
+# allocation of a CPU node, e.g. `srun -c 64 python benchmark_fit_scaling.py`.
+# Every fit runs the same number of optimiser updates (20 epochs at batch
+# size 1), so larger batches run more epochs; compare `time_per_update` and
+# the final `test_error` rather than the wall time of equal epochs.
+
+database_dict = {
+    "train.extxyz": [],
+    "test.extxyz": [],
+}
+for seed in range(8):
+    cluster = Icosahedron("Cu", noshells=3)
+    cluster.rattle(stdev=0.05, seed=seed)
+    cluster.calc = EMT()
+    forces = cluster.get_forces()
+    molecule = Molecule.from_ase_atoms(cluster)
+    molecule.properties["REF_energy"] = cluster.get_potential_energy()
+    molecule.properties["REF_virial"] = [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+    for i in range(len(molecule)):
+        molecule.sites[i].properties["REF_forces"] = forces[i]
+    database_dict["train.extxyz"].append(molecule)
+    database_dict["test.extxyz"].append(molecule)
+
+machine_learning_fit_kwargs = {
+    "database_dir":None,
+    "database_dict":database_dict,
+    "run_fits_on_different_cluster":True,
+    "name":"MACE",
+    "mlip_type":"MACE",
+    "ref_energy_name":"REF_energy",
+    "ref_force_name":"REF_forces",
+    "ref_virial_name":None,
+    "species_list":None,
+    "foundation_model":"small",
+    "multiheads_finetuning":False,
+    "loss":"forces_only",
+    "energy_weight" : 0.0,
+    "forces_weight" : 1.0,
+    "stress_weight" : 0.0,
+    "E0s" : "average",
+    "scaling" : "rms_forces_scaling",
+    "ema":True,
+    "ema_decay" : 0.99,
+    "swa":False,
+    "amsgrad":True,
+    "default_dtype" : "float64",
+    "keep_isolated_atoms":False,
+    "lr" : 0.001,
+    "device" : "cpu",
+    "save_cpu" :True,
+    "seed" : 3,
+    "enable_cueq":False,
+}
+
+max_cores = get_allocated_cores()
+core_counts = [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= max_cores]
+n_train = len(database_dict["train.extxyz"])
+epochs_batch_size_1 = 20
+results = []
+for batch_size in (1, 8):
+    max_num_epochs = epochs_for_batch_size(epochs_batch_size_1, n_train, batch_size)
+    n_updates = max_num_epochs * -(-n_train // batch_size)
+    for num_threads in core_counts:
+        job_fit = machine_learning_fit_in_process(cpu_parallel=True, num_threads=num_threads, batch_size=batch_size, max_num_epochs=max_num_epochs, patience=max_num_epochs, **machine_learning_fit_kwargs)
+        start = time.perf_counter()
+        responses = run_locally(job_fit, create_folders=True)
+        wall_time = time.perf_counter() - start
+        results.append({
+            "num_threads": num_threads,
+            "batch_size": batch_size,
+            "max_num_epochs": max_num_epochs,
+            "n_updates": n_updates,
+            "wall_time": wall_time,
+            "time_per_update": wall_time / n_updates,
+            "test_error": responses[job_fit.uuid][1].output["test_error"],
+        })
+        print(results[-1])
+
+with open('fit_scaling_result.json', 'w', encoding='utf-8') as f:
+    json.dump(results, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,82 @@
+"""
+Lightweight ASE calculators used as stand-ins for the MLIP in the GAIMS loop.
+
+These calculators are *not* meant to be accurate.  They are cheap, deterministic
+and CPU-only so that the orchestration of the active-learning loop (database
+handling, convergence logic, job bookkeeping) can be exercised and profiled in
+seconds instead of hours.
+
+* ``HarmonicSurrogate`` - a quadratic model anchored at a reference
+  configuration, with an isotropic curvature fitted from the stored reference
+  forces (see ``gaims_geoopt.jobs.fit_harmonic_surrogate``).
+"""
+
+
+import numpy as np
+from ase.calculators.calculator import Calculator, all_changes
+from ase.geometry import find_mic
+
+
+def minimum_image_displacement(atoms, reference_positions):
+    """Return the displacement of ``atoms`` from ``reference_positions``.
+
+    Periodic directions are wrapped with the minimum-image convention so that
+    atoms crossing a cell boundary do not show up as huge displacements.
+
+    Parameters
+    ----------
+    atoms : :class:`ase.Atoms`
+        Current configuration.
+    reference_positions : array_like
+        Cartesian reference positions (shape: ``(n_atoms, 3)``).
+
+    Returns
+    -------
+    numpy.ndarray
+        Cartesian displacements (shape: ``(n_atoms, 3)``).
+    """
+
+    displacement = atoms.get_positions() - np.asarray(reference_positions)
+    if atoms.pbc.any():
+        displacement, _ = find_mic(displacement, atoms.cell, atoms.pbc)
+    return displacement
+
+
+class HarmonicSurrogate(Calculator):
+    """Quadratic surrogate potential around an anchor configuration.
+
+    .. math::
+
+        E(x) = E_a - F_a \\cdot (x - x_a) + \\frac{k}{2} |x - x_a|^2
+
+    Parameters
+    ----------
+    anchor_positions : array_like
+        Cartesian positions of the anchor configuration (AA).
+    anchor_forces : array_like
+        Reference forces at the anchor (eV/AA).
+    anchor_energy : float
+        Reference energy at the anchor (eV).
+    curvature : float
+        Isotropic curvature *k* (eV/AA^2).
+    """
+
+    implemented_properties = ["energy", "free_energy", "forces"]
+
+    def __init__(self, anchor_positions, anchor_forces, anchor_energy=0.0, curvature=10.0, **kwargs):
+        super().__init__(**kwargs)
+        self.anchor_positions = np.asarray(anchor_positions, dtype=float)
+        self.anchor_forces = np.asarray(anchor_forces, dtype=float)
+        self.anchor_energy = float(anchor_energy)
+        self.curvature = float(curvature)
+
+    def calculate(self, atoms=None, properties=None, system_changes=all_changes):
+        super().calculate(atoms, properties, system_changes)
+        displacement = minimum_image_displacement(self.atoms, self.anchor_positions)
+        forces = self.anchor_forces - self.curvature * displacement
+        energy = (
+            self.anchor_energy
+            - np.sum(self.anchor_forces * displacement)
+            + 0.5 * self.curvature * np.sum(displacement**2)
+        )
+        self.results = {"energy": energy, "free_energy": energy, "forces": forces}
@@ -14,6 +14,9 @@ This module defines two core components, both designed to be used within the
      FHI-aims) to evaluate error / convergence, updates the database, and calls
      itself again.
 
+  For fast CPU-only testing both the reference (``"EMT"`` / ``"LJ"``) and the
+  MLIP (``"harmonic"``) can be swapped for cheap analytic stand-ins.
+
 * ``MLIPAssistedGeoOptMaker`` - a convenience *Maker* that kicks off the first
   reference energy/force calculation, seeds the EXTXYZ database, and launches
   the recursive convergence job.
@@ -40,25 +43,66 @@ number of GAIMS geometry optimisation steps is reached.
 
 
 from dataclasses import dataclass
-from atomate2.ase.jobs import GFNxTBStaticMaker
+from atomate2.ase.jobs import GFNxTBStaticMaker, LennardJonesStaticMaker
 from jobflow import Flow, job, Response, Maker
 from autoplex.fitting.common.jobs import machine_learning_fit
 import logging
 from gaims_geoopt.jobs import evaluate_max_force, add_structure_database, get_mace_relax_job, extract_mol_or_structure
+from gaims_geoopt.jobs import get_optimizer_class, machine_learning_fit_in_process, route_job
+from gaims_geoopt.jobs import apply_constraints, evaluate_force_error, symmetrize_mol_or_struct, symmetrize_forces
+from gaims_geoopt.jobs import EMTStaticMaker, fit_harmonic_surrogate, get_surrogate_relax_job, select_gdiis_or_relaxed
 from atomate2.aims.jobs.core import StaticMaker as AimsStaticMaker
 from pymatgen.io.aims.sets.core import StaticSetGenerator
 from pymatgen.core import Structure, Molecule
+from gaims_geoopt.schedules import adaptive_budgets, epochs_for_batch_size, precision_weight, reference_precision_level, reference_precision_params
+from gaims_geoopt.symmetry import detect_symmetry, symmetrize_positions, with_positions
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+# -----------------------------------------------------------------------------
+#  Reference calculators
+# -----------------------------------------------------------------------------
+
+def make_reference_static_job(calculator, calculator_kwargs, mol_or_struct):
+    """Build the static reference job for ``calculator``.
+
+    Returns
+    -------
+    tuple
+        The static job and a reference to the configuration (carrying the
+        reference energy) that should be added to the database.
+    """
+
+    if calculator == "GFN2-xTB":
+        # Semi‑empirical GFN2‑xTB reference (molecules only).
+        job_static = GFNxTBStaticMaker(
+            calculator_kwargs={"method": "GFN2-xTB"},
+        ).make(mol_or_struct)
+        return job_static, job_static.output.output.mol_or_struct
+    if calculator == "aims":
+        # FHI‑aims reference calculation (molecule or periodic structure).
+        job_static = AimsStaticMaker(
+            input_set_generator=StaticSetGenerator(user_params=calculator_kwargs)
+        ).make(mol_or_struct)
+        return job_static, job_static.output.output.structure
+    if calculator == "EMT":
+        # Analytic stand-ins for fast, deterministic testing / profiling.
+        job_static = EMTStaticMaker(calculator_kwargs=calculator_kwargs).make(mol_or_struct)
+        return job_static, job_static.output.output.mol_or_struct
+    if calculator == "LJ":
+        job_static = LennardJonesStaticMaker(calculator_kwargs=calculator_kwargs).make(mol_or_struct)
+        return job_static, job_static.output.output.mol_or_struct
+    raise ValueError(f"Unknown reference calculator: {calculator}")
+
+
 # -----------------------------------------------------------------------------
 #  Recursive convergence / continuation job
 # -----------------------------------------------------------------------------
 
 @job 
-def check_convergence_and_next(struct, database_dict, last_dir, max_force, max_force_criteria, n_gaims_geoopt_steps, max_gaims_geoopt_steps, database_size_limit, n_mlip_relax_steps, machine_learning_fit_kwargs, relax_calculator_kwargs, calculator, calculator_kwargs):
+def check_convergence_and_next(struct, database_dict, last_dir, max_force, max_force_criteria, n_gaims_geoopt_steps, max_gaims_geoopt_steps, database_size_limit, n_mlip_relax_steps, machine_learning_fit_kwargs, relax_calculator_kwargs, calculator, calculator_kwargs, mlip="MACE", gdiis_kwargs=None, budget_kwargs=None, force_error=None, symmetry=None, optimizer_kwargs=None, last_relax_dir=None, cpu_parallel_fit_kwargs=None, zero_shot_first_iteration=False, stage_configs=None, precision_kwargs=None, reference_precision=None, graph_cache_dir=None, constraints=None):
     """Decide whether to *stop* or *continue* the active-learning geo-opt loop.
 
     Parameters
@@ -85,8 +129,80 @@ def check_convergence_and_next(struct, database_dict, last_dir, max_force, max_f
     machine_learning_fit_kwargs, relax_calculator_kwargs
         Keyword overrides passed on to downstream jobs.
     calculator, calculator_kwargs
-        Choice of reference calculator (``"GFN2-xTB"`` or ``"aims"``) and its
-        specific keyword arguments.
+        Choice of reference calculator (``"GFN2-xTB"``, ``"aims"``, or the
+        analytic stand-ins ``"EMT"`` and ``"LJ"``) and its specific keyword
+        arguments.
+    mlip
+        Potential fitted each iteration: ``"MACE"`` or the cheap
+        ``"harmonic"`` surrogate (see ``gaims_geoopt.calculators``).  For the
+        surrogate, ``machine_learning_fit_kwargs`` are forwarded to
+        ``fit_harmonic_surrogate``.
+    gdiis_kwargs
+        ``None`` (default) disables the GDIIS step proposer.  A dict enables
+        it and is forwarded to ``select_gdiis_or_relaxed`` (``history``,
+        ``trust_radius``, ``curvature``, ...).
+    budget_kwargs
+        ``None`` (default) keeps the fixed fit / relax budgets.  A dict enables
+        the adaptive controller ``gaims_geoopt.schedules.adaptive_budgets``
+        (overriding ``max_num_epochs``, ``patience``, the relax ``fmax`` and
+        ``max_steps``) with the dict as its settings.
+    force_error
+        Maximum MLIP-vs-reference force error (eV/AA) of the last fit over its
+        training configurations, only tracked when ``budget_kwargs`` is set.
+    symmetry
+        Symmetry of the input from ``gaims_geoopt.symmetry.detect_symmetry``,
+        or ``None``.  When set, ML relaxed geometries and reference forces are
+        symmetrised and symmetry-equivalent database entries are deduplicated.
+    optimizer_kwargs
+        ``None`` (default) keeps atomate2's default optimiser for the ML
+        relaxation.  A dict selects the ``optimizer`` (``"BFGS"``,
+        ``"LBFGS"``, ``"FIRE"``, ``"PreconLBFGS"``, ``"PreconFIRE"``) and
+        whether to ``warm_start`` (default ``False``; ``"BFGS"`` and
+        ``"LBFGS"`` only) each relaxation from the optimiser state of the
+        previous one.
+    last_relax_dir
+        Directory of the previous ML relaxation holding its optimiser state.
+    cpu_parallel_fit_kwargs
+        ``None`` (default) runs the MACE fit as configured.  A dict turns on the
+        multi-core CPU mode for ``device="cpu"`` fits: ``num_threads``
+        (default: all cores allocated to the job) and ``max_batch_size``
+        (default 8, capped by the training set size, ignored if
+        ``batch_size`` is set explicitly).  The larger batch keeps the number
+        of optimiser updates: the fixed ``max_num_epochs`` and ``patience``
+        (set for batch size 1) are scaled up accordingly.  Fits on other
+        devices keep their batch size.
+    zero_shot_first_iteration
+        If ``True`` and this is the first MACE iteration (``last_dir`` is
+        ``None``), skip the fit and relax directly on the foundation model.
+        The next iteration then fine-tunes the foundation model as usual.
+    stage_configs
+        Per-stage ``jobflow_remote`` execution configuration, see
+        ``gaims_geoopt.jobs.route_job``.  Keys are ``"fit"`` (MLIP fits),
+        ``"relax"`` (ML relaxations and other MLIP evaluations),
+        ``"reference"`` (static reference calculations) and
+        ``"bookkeeping"`` (small helper jobs, including this one); values
+        are dicts with ``worker``, ``resources`` and/or ``exec_config``.
+        Carried through every recursive iteration.
+    precision_kwargs
+        ``None`` (default) runs every FHI-aims reference with
+        ``calculator_kwargs``.  A dict enables the precision schedule of
+        ``gaims_geoopt.schedules`` (settings override
+        ``REFERENCE_PRECISION_DEFAULT``): loose SCF settings far from
+        convergence, ``calculator_kwargs`` near it.  Database entries are
+        tagged with ``REF_precision`` and a ``config_weight``.
+    reference_precision
+        Precision level of the last reference calculation.  Convergence is
+        only accepted at the ``"tight"`` level.
+    graph_cache_dir
+        ``None`` (default) preprocesses the whole database for every MACE fit.
+        A directory enables the persistent preprocessed-data cache of
+        ``gaims_geoopt.jobs.mace_graph_cache``, so each fit only builds the
+        neighbour lists of configurations new to the database.
+    constraints
+        ``selective_dynamics`` of the input (``None`` if unconstrained).  It is
+        re-applied to every relaxed geometry before the reference calculation,
+        stored on the database entries, and the forces of constrained atoms are
+        masked out of MACE fits (``gaims_geoopt.jobs.mace_force_mask``).
     """
 
     # ------------------------------------------------------------------
@@ -98,7 +214,12 @@ def check_convergence_and_next(struct, database_dict, last_dir, max_force, max_f
             f"MLIP assisted Geometry Optimization stopped reach maximum Geoopt steps, with max_force: {max_force} > {max_force_criteria}, ML assisted steps: {n_mlip_relax_steps}, Geoopt steps: {n_gaims_geoopt_steps} "
         )
         return None
-    if max_force < max_force_criteria or n_mlip_relax_steps == 2:
+    if max_force < max_force_criteria and reference_precision not in (None, "tight"):
+        # Only a reference at the user's own settings may declare convergence.
+        logging.info(
+            f"MLIP assisted Geometry Optimization converged at {reference_precision} reference precision with max_force: {max_force} < {max_force_criteria}, verifying with tight settings."
+        )
+    elif max_force < max_force_criteria or n_mlip_relax_steps == 2:
         if max_force < max_force_criteria:
             logging.info(
                     f"MLIP assisted Geometry Optimization Converged with max_force: {max_force} < {max_force_criteria}, ML assisted relax steps: {n_mlip_relax_steps}, Geoopt steps: {n_gaims_geoopt_steps}"
@@ -114,117 +235,204 @@ def check_convergence_and_next(struct, database_dict, last_dir, max_force, max_f
     )
 
     # ------------------------------------------------------------------
-    # 2. Prepare kwargs for the next MACE fit
+    # 2. Fit the MLIP and relax on it
     # ------------------------------------------------------------------
 
-    if last_dir is None:
-        # First iteration – choose a small foundation model unless overridden.
-        if "foundation_model" not in machine_learning_fit_kwargs:
-            machine_learning_fit_kwargs["foundation_model"] = "small"
+    n_train = len(database_dict["train.extxyz"])
+    cpu_parallel = cpu_parallel_fit_kwargs is not None and machine_learning_fit_kwargs.get("device", "cpu") == "cpu"
+    fit_batch_size = machine_learning_fit_kwargs.get("batch_size", 1)
+    scale_fit_epochs = False
+    if cpu_parallel and "batch_size" not in machine_learning_fit_kwargs:
+        # Larger batches give every CPU thread enough work; the fixed epoch
+        # budget is rescaled below to keep the number of optimiser updates.
+        fit_batch_size = min(cpu_parallel_fit_kwargs.get("max_batch_size", 8), max(n_train, 1))
+        scale_fit_epochs = True
+
+    relax_fmax = None
+    relax_calculator_kwargs_iteration = relax_calculator_kwargs
+    if budget_kwargs is not None:
+        budgets = adaptive_budgets(max_force, max_force_criteria, force_error, n_train, budget_kwargs, fit_batch_size)
+        relax_fmax = budgets["fmax"]
+        relax_calculator_kwargs_iteration = {**relax_calculator_kwargs, "max_steps": budgets["max_steps"]}
+
+    if mlip == "MACE" and last_dir is None and zero_shot_first_iteration:
+        # Zero-shot: relax on the foundation model and only fine-tune from
+        # the next iteration on, starting from a better geometry.
+        mlip_output = {"mlip_path": None, "foundation_model": machine_learning_fit_kwargs.get("foundation_model", "small")}
+        logging.info(f"Zero-shot ML relaxation with foundation model: {mlip_output['foundation_model']}")
+        job_relax = route_job(get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs_iteration, relax_fmax, optimizer_kwargs, last_relax_dir), "relax", stage_configs)
+        jobs = []
+        next_last_dir = None
+    elif mlip == "MACE":
+        if last_dir is None:
+            # First iteration – choose a small foundation model unless overridden.
+            if "foundation_model" not in machine_learning_fit_kwargs:
+                machine_learning_fit_kwargs["foundation_model"] = "small"
+        else:
+            # Warm‑start from the previous model.
+            machine_learning_fit_kwargs["foundation_model"] = last_dir[0] + "/MACE.model"
+
+        # Default hyper‑parameters for the *machine_learning_fit* helper.
+        machine_learning_fit_kwargs_default = {
+            "database_dir":None,
+            "database_dict":database_dict,
+            "run_fits_on_different_cluster":True,
+            "name":"MACE",
+            "mlip_type":"MACE",
+            "ref_energy_name":"REF_energy",
+            "ref_force_name":"REF_forces",
+            "ref_virial_name":None,
+            "species_list":None,
+            "num_processes_fit":1,
+            #"foundation_model":foundation_model,
+            "multiheads_finetuning":False,
+            "loss":"forces_only",
+            "energy_weight" : 0.0,
+            "forces_weight" : 1.0,
+            "stress_weight" : 0.0,
+            "E0s" : "average",
+            "scaling" : "rms_forces_scaling",
+            "batch_size" : 1,
+            "max_num_epochs" : 500,
+            "ema":True,
+            "ema_decay" : 0.99,
+            "swa":False,
+            "start_swa":3000,
+            "amsgrad":True,
+            "default_dtype" : "float64",
+            "keep_isolated_atoms":False,
+            "lr" : 0.001,
+            "patience" : 500,
+            "device" : "cpu",
+            "save_cpu" :True,
+            "seed" : 3,
+        }
+
+        machine_learning_fit_kwargs_default.update(machine_learning_fit_kwargs)
+        machine_learning_fit_kwargs_default["batch_size"] = fit_batch_size
+        if budget_kwargs is not None:
+            machine_learning_fit_kwargs_default["max_num_epochs"] = budgets["max_num_epochs"]
+            machine_learning_fit_kwargs_default["patience"] = budgets["patience"]
+        elif scale_fit_epochs:
+            for key in ("max_num_epochs", "patience"):
+                machine_learning_fit_kwargs_default[key] = epochs_for_batch_size(machine_learning_fit_kwargs_default[key], n_train, fit_batch_size)
+
+        # 2a. Fit / fine‑tune the MACE potential.
+        if cpu_parallel or graph_cache_dir is not None or constraints is not None:
+            job_fit = machine_learning_fit_in_process(
+                cpu_parallel=cpu_parallel,
+                num_threads=(cpu_parallel_fit_kwargs or {}).get("num_threads"),
+                graph_cache_dir=graph_cache_dir,
+                constrained_mol_or_struct=None if constraints is None else struct,
+                **machine_learning_fit_kwargs_default,
+            )
+        else:
+            job_fit = machine_learning_fit(**machine_learning_fit_kwargs_default)
+        route_job(job_fit, "fit", stage_configs)
+
+        # 2b. Use the fitted model for a force‑field relaxation.
+        mlip_output = job_fit.output
+        next_last_dir = job_fit.output.mlip_path
+        jobs = [job_fit]
+        job_relax = route_job(get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs_iteration, relax_fmax, optimizer_kwargs, last_relax_dir), "relax", stage_configs)
+    elif mlip == "harmonic":
+        # Cheap stand-in for profiling / regression testing of the loop.
+        job_fit = route_job(fit_harmonic_surrogate(database_dict, **machine_learning_fit_kwargs), "fit", stage_configs)
+        mlip_output = job_fit.output
+        next_last_dir = job_fit.output.mlip_path
+        jobs = [job_fit]
+        job_relax = route_job(get_surrogate_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs_iteration, relax_fmax, optimizer_kwargs, last_relax_dir), "relax", stage_configs)
     else:
-        # Warm‑start from the previous model.
-        machine_learning_fit_kwargs["foundation_model"] = last_dir[0] + "/MACE.model"
-
-    # Default hyper‑parameters for the *machine_learning_fit* helper.
-    machine_learning_fit_kwargs_default = {
-        "database_dir":None,
-        "database_dict":database_dict,
-        "run_fits_on_different_cluster":True,
-        "name":"MACE",
-        "mlip_type":"MACE",
-        "ref_energy_name":"REF_energy",
-        "ref_force_name":"REF_forces",
-        "ref_virial_name":None,
-        "species_list":None,
-        "num_processes_fit":1,
-        #"foundation_model":foundation_model,
-        "multiheads_finetuning":False,
-        "loss":"forces_only",
-        "energy_weight" : 0.0,
-        "forces_weight" : 1.0,
-        "stress_weight" : 0.0,
-        "E0s" : "average",
-        "scaling" : "rms_forces_scaling",
-        "batch_size" : 1,
-        "max_num_epochs" : 500,
-        "ema":True,
-        "ema_decay" : 0.99,
-        "swa":False,
-        "start_swa":3000,
-        "amsgrad":True,
-        "default_dtype" : "float64",
-        "keep_isolated_atoms":False,
-        "lr" : 0.001,
-        "patience" : 500,
-        "device" : "cpu",
-        "save_cpu" :True,
-        "seed" : 3,
-    }
-
-    machine_learning_fit_kwargs_default.update(machine_learning_fit_kwargs)
+        raise ValueError(f"Unknown MLIP: {mlip}")
+    jobs.append(job_relax)
 
     # ------------------------------------------------------------------
-    # 3. Launch downstream jobs
+    # 3. High‑accuracy *reference* calculation on the relaxed geometry
     # ------------------------------------------------------------------
-    # 3a. Fit / fine‑tune the MACE potential.
-    job_macefit = machine_learning_fit(**machine_learning_fit_kwargs_default)
-
-    # 3b. Use the fitted model for a force‑field relaxation.
-    job_relax = get_mace_relax_job(job_macefit.output, struct, max_force_criteria, relax_calculator_kwargs)
 
-    # 3c. High‑accuracy *reference* calculation and DB update depend on the
-    #     chosen calculator.
     if calculator == "GFN2-xTB":
-        # ---------------------
-        # * Semi‑empirical GFN2‑xTB reference (molecules only)
-        # ---------------------
+        # xTB only handles molecules.
+        next_struct = job_relax.output.output.molecule
+    else:
+        job_mol_or_structure = route_job(extract_mol_or_structure(job_relax.output.output), "bookkeeping", stage_configs)
+        jobs.append(job_mol_or_structure)
+        next_struct = job_mol_or_structure.output
+    if gdiis_kwargs is not None:
+        # Optionally replace the relaxed geometry by a GDIIS extrapolation
+        # over the stored reference history.
+        job_gdiis = route_job(select_gdiis_or_relaxed(database_dict, next_struct, gdiis_kwargs), "bookkeeping", stage_configs)
+        jobs.append(job_gdiis)
+        next_struct = job_gdiis.output
+    if symmetry is not None:
+        # Remove the symmetry-breaking noise of the ML relaxation.
+        job_symmetrize = route_job(symmetrize_mol_or_struct(symmetry, next_struct), "bookkeeping", stage_configs)
+        jobs.append(job_symmetrize)
+        next_struct = job_symmetrize.output
+    if constraints is not None:
+        # Keep the input constraints for the reference and the next relaxation.
+        job_constrain = route_job(apply_constraints(constraints, next_struct), "bookkeeping", stage_configs)
+        jobs.append(job_constrain)
+        next_struct = job_constrain.output
+    next_precision = None
+    calculator_kwargs_iteration = calculator_kwargs
+    if precision_kwargs is not None and calculator == "aims":
+        next_precision = reference_precision_level(max_force, max_force_criteria, precision_kwargs)
+        calculator_kwargs_iteration = reference_precision_params(next_precision, max_force, calculator_kwargs, precision_kwargs)
+    job_static, ref_struct = make_reference_static_job(calculator, calculator_kwargs_iteration, next_struct)
+    jobs.append(route_job(job_static, "reference", stage_configs))
+    ref_forces = job_static.output.output.forces
+    if symmetry is not None:
+        job_symmetrize_forces = route_job(symmetrize_forces(symmetry, ref_forces), "bookkeeping", stage_configs)
+        jobs.append(job_symmetrize_forces)
+        ref_forces = job_symmetrize_forces.output
 
-        job_static = GFNxTBStaticMaker(
-            calculator_kwargs={"method": "GFN2-xTB"},
-        ).make(job_relax.output.output.molecule)
-        job_max_force = evaluate_max_force(job_static.output.output.forces, job_relax.output.output.molecule )
-        job_add_database = add_structure_database(database_dict, job_static.output.output.mol_or_struct, job_static.output.output.forces, database_size_limit)
-        job_check_convergence_and_next = check_convergence_and_next(job_relax.output.output.molecule,
-                                                                    job_add_database.output,
-                                                                    job_macefit.output.mlip_path,
-                                                                    job_max_force.output,
-                                                                    max_force_criteria,
-                                                                    n_gaims_geoopt_steps+1,
-                                                                    max_gaims_geoopt_steps,
-                                                                    database_size_limit,
-                                                                    job_relax.output.output.n_steps,
-                                                                    machine_learning_fit_kwargs,
-                                                                    relax_calculator_kwargs,
-                                                                    calculator,
-                                                                    calculator_kwargs,
-                                                                    )
-        flow = Flow([job_macefit, job_relax, job_static, job_max_force, job_add_database, job_check_convergence_and_next])
-    elif calculator == "aims":
-        # ---------------------
-        # * FHI‑aims reference calculation (molecule or periodic structure)
-        # ---------------------
+    # ------------------------------------------------------------------
+    # 4. Update the database and recurse
+    # ------------------------------------------------------------------
 
-        job_mol_or_structure = extract_mol_or_structure(job_relax.output.output)
-        job_static = AimsStaticMaker(
-            input_set_generator=StaticSetGenerator(user_params=calculator_kwargs)
-        ).make(job_mol_or_structure.output)
-        job_max_force = evaluate_max_force(job_static.output.output.forces, job_mol_or_structure.output)
-        job_add_database = add_structure_database(database_dict, job_static.output.output.structure, job_static.output.output.forces, database_size_limit)
-        job_check_convergence_and_next = check_convergence_and_next(job_mol_or_structure.output,
-                                                                    job_add_database.output,
-                                                                    job_macefit.output.mlip_path,
-                                                                    job_max_force.output,
-                                                                    max_force_criteria, 
-                                                                    n_gaims_geoopt_steps+1,
-                                                                    max_gaims_geoopt_steps,
-                                                                    database_size_limit,
-                                                                    job_relax.output.output.n_steps,
-                                                                    machine_learning_fit_kwargs,
-                                                                    relax_calculator_kwargs,
-                                                                    calculator,
-                                                                    calculator_kwargs
-                                                                    )
-        flow = Flow([job_macefit, job_relax, job_mol_or_structure, job_static, job_max_force, job_add_database, job_check_convergence_and_next])
+    job_max_force = route_job(evaluate_max_force(ref_forces, next_struct), "bookkeeping", stage_configs)
+    job_add_database = route_job(add_structure_database(database_dict, ref_struct, ref_forces, database_size_limit, symmetry, next_precision, precision_weight(next_precision, precision_kwargs), constraints), "bookkeeping", stage_configs)
+    next_force_error = None
+    if budget_kwargs is not None:
+        job_force_error = route_job(evaluate_force_error(database_dict, mlip_output, mlip, relax_calculator_kwargs), "relax", stage_configs)
+        jobs.append(job_force_error)
+        next_force_error = job_force_error.output
+    next_relax_dir = None
+    if optimizer_kwargs is not None:
+        # Hand the optimiser state of this relaxation to the next one.
+        next_relax_dir = job_relax.output.dir_name
+    job_check_convergence_and_next = check_convergence_and_next(next_struct,
+                                                                job_add_database.output,
+                                                                next_last_dir,
+                                                                job_max_force.output,
+                                                                max_force_criteria,
+                                                                n_gaims_geoopt_steps+1,
+                                                                max_gaims_geoopt_steps,
+                                                                database_size_limit,
+                                                                job_relax.output.output.n_steps,
+                                                                machine_learning_fit_kwargs,
+                                                                relax_calculator_kwargs,
+                                                                calculator,
+                                                                calculator_kwargs,
+                                                                mlip=mlip,
+                                                                gdiis_kwargs=gdiis_kwargs,
+                                                                budget_kwargs=budget_kwargs,
+                                                                force_error=next_force_error,
+                                                                symmetry=symmetry,
+                                                                optimizer_kwargs=optimizer_kwargs,
+                                                                last_relax_dir=next_relax_dir,
+                                                                cpu_parallel_fit_kwargs=cpu_parallel_fit_kwargs,
+                                                                zero_shot_first_iteration=False,
+                                                                stage_configs=stage_configs,
+                                                                precision_kwargs=precision_kwargs,
+                                                                reference_precision=next_precision,
+                                                                graph_cache_dir=graph_cache_dir,
+                                                                constraints=constraints,
+                                                                )
+    # Neither dynamic nor passed on: the flow it creates is routed stage by
+    # stage above.
+    route_job(job_check_convergence_and_next, "bookkeeping", stage_configs, dynamic=False, pass_manager_config=False)
+    flow = Flow(jobs + [job_max_force, job_add_database, job_check_convergence_and_next])
     return Response(replace=flow)
 
 
@@ -238,63 +446,103 @@ class MLIPAssistedGeoOptMaker(Maker):
 
     name: str = "MLIP assisted GeoOpt"
 
-    def make(self, molecule, database_dict, max_force_criteria, max_gaims_geoopt_steps = 30, database_size_limit = 10, machine_learning_fit_kwargs={}, relax_calculator_kwargs={}, calculator = "GFN2-xTB", calculator_kwargs = {}):
-        """Kick-off the optimisation by running the *first* reference calculation."""
+    def make(self, molecule, database_dict, max_force_criteria, max_gaims_geoopt_steps = 30, database_size_limit = 10, machine_learning_fit_kwargs={}, relax_calculator_kwargs={}, calculator = "GFN2-xTB", calculator_kwargs = {}, mlip = "MACE", gdiis_kwargs = None, budget_kwargs = None, symmetry_kwargs = None, optimizer_kwargs = None, cpu_parallel_fit_kwargs = None, zero_shot_first_iteration = False, stage_configs = None, precision_kwargs = None, graph_cache_dir = None):
+        """Kick-off the optimisation by running the *first* reference calculation.
+
+        ``calculator`` selects the reference (``"GFN2-xTB"``, ``"aims"``, or the
+        analytic stand-ins ``"EMT"`` / ``"LJ"``) and ``mlip`` the potential that
+        is fitted each iteration (``"MACE"`` or the ``"harmonic"`` surrogate).
+        Passing ``gdiis_kwargs`` (e.g. ``{}``) enables the GDIIS step proposer
+        and ``budget_kwargs`` the adaptive fit / relax budgets.
+        ``symmetry_kwargs`` (e.g. ``{"symprec": 0.01}``) turns on the symmetry
+        mode: the point / space group of ``molecule`` is detected and preserved
+        throughout the loop, and periodic FHI-aims runs use the space group to
+        reduce the k-grid.  ``optimizer_kwargs`` (e.g.
+        ``{"optimizer": "BFGS", "warm_start": True}``) selects the ML
+        relaxation optimiser and carries its state across iterations.
+        ``cpu_parallel_fit_kwargs`` (e.g. ``{}``) spreads CPU fits over all
+        allocated cores.  ``zero_shot_first_iteration=True`` runs the first ML
+        relaxation on the MACE foundation model without fine-tuning.
+        ``stage_configs`` routes fits, ML relaxations, reference calculations
+        and bookkeeping jobs to their own ``jobflow_remote`` workers.
+        ``precision_kwargs`` (e.g. ``{}``) loosens the FHI-aims settings far
+        from convergence.  ``graph_cache_dir`` (a directory visible to the fit
+        workers) caches the preprocessed MACE training samples across fits.
+        Constraints of ``molecule`` (``selective_dynamics``, e.g. from ASE
+        ``FixAtoms``) are kept throughout the loop and the forces of fixed
+        atoms are left out of the MACE fits.
+        """
 
         # ------------------------------------------------------------------
         # 1. Initial reference calculation and DB seeding
         # ------------------------------------------------------------------
 
-        if calculator == "GFN2-xTB":
+        if calculator == "GFN2-xTB" and isinstance(molecule, Structure):
             # xTB only supports *molecules*, warn otherwise.
-
-            if isinstance(molecule, Structure):
-                logging.info(
-                    f"Requesting a GFN2-xTB for periodic system which is not supported."
-                )
-                return None
-            job_static = GFNxTBStaticMaker(
-                calculator_kwargs={"method": "GFN2-xTB"},
-            ).make(molecule)
-            job_max_force = evaluate_max_force(job_static.output.output.forces, molecule)
-            job_add_database = add_structure_database(database_dict, job_static.output.output.mol_or_struct, job_static.output.output.forces, database_size_limit)
-            job_check_convergence_and_next = check_convergence_and_next(molecule,
-                                                                        job_add_database.output,
-                                                                        None,
-                                                                        job_max_force.output,
-                                                                        max_force_criteria, 
-                                                                        0,
-                                                                        max_gaims_geoopt_steps,
-                                                                        database_size_limit,
-                                                                        -1,
-                                                                        machine_learning_fit_kwargs,
-                                                                        relax_calculator_kwargs,
-                                                                        calculator,
-                                                                        calculator_kwargs
-                                                                        )
-        elif calculator == "aims":
-            job_static = AimsStaticMaker(
-                input_set_generator=StaticSetGenerator(user_params=calculator_kwargs)
-            ).make(molecule)
-            job_max_force = evaluate_max_force(job_static.output.output.forces, molecule)
-            job_add_database = add_structure_database(database_dict, job_static.output.output.structure, job_static.output.output.forces, database_size_limit)
-            job_check_convergence_and_next = check_convergence_and_next(molecule,
-                                                                        job_add_database.output,
-                                                                        None,
-                                                                        job_max_force.output,
-                                                                        max_force_criteria, 
-                                                                        0,
-                                                                        max_gaims_geoopt_steps,
-                                                                        database_size_limit,
-                                                                        -1,
-                                                                        machine_learning_fit_kwargs,
-                                                                        relax_calculator_kwargs,
-                                                                        calculator,
-                                                                        calculator_kwargs
-                                                                        )
+            logging.info(
+                f"Requesting a GFN2-xTB for periodic system which is not supported."
+            )
+            return None
+        if optimizer_kwargs is not None:
+            # Reject unsupported optimiser settings before the first reference.
+            get_optimizer_class(optimizer_kwargs.get("optimizer", "BFGS"), optimizer_kwargs.get("warm_start", False))
+        symmetry = None
+        if symmetry_kwargs is not None:
+            # Detect the symmetry once and start from a symmetrised geometry.
+            symmetry = detect_symmetry(molecule, **symmetry_kwargs)
+            molecule = with_positions(molecule, symmetrize_positions(symmetry, molecule))
+            if calculator == "aims" and isinstance(molecule, Structure):
+                calculator_kwargs = {"symmetry_reduced_k_grid_spg": True, **calculator_kwargs}
+        constraints = None
+        if "selective_dynamics" in molecule.site_properties:
+            # Carried through the loop, see check_convergence_and_next.
+            constraints = [[bool(flag) for flag in flags] for flags in molecule.site_properties["selective_dynamics"]]
+            if all(all(flags) for flags in constraints):
+                constraints = None
+        precision = None
+        calculator_kwargs_initial = calculator_kwargs
+        if precision_kwargs is not None and calculator == "aims":
+            precision = reference_precision_level(None, max_force_criteria, precision_kwargs)
+            calculator_kwargs_initial = reference_precision_params(precision, None, calculator_kwargs, precision_kwargs)
+        job_static, ref_struct = make_reference_static_job(calculator, calculator_kwargs_initial, molecule)
+        jobs = [route_job(job_static, "reference", stage_configs)]
+        ref_forces = job_static.output.output.forces
+        if symmetry is not None:
+            job_symmetrize_forces = route_job(symmetrize_forces(symmetry, ref_forces), "bookkeeping", stage_configs)
+            jobs.append(job_symmetrize_forces)
+            ref_forces = job_symmetrize_forces.output
+        job_max_force = route_job(evaluate_max_force(ref_forces, molecule), "bookkeeping", stage_configs)
+        job_add_database = route_job(add_structure_database(database_dict, ref_struct, ref_forces, database_size_limit, symmetry, precision, precision_weight(precision, precision_kwargs), constraints), "bookkeeping", stage_configs)
+        job_check_convergence_and_next = check_convergence_and_next(molecule,
+                                                                    job_add_database.output,
+                                                                    None,
+                                                                    job_max_force.output,
+                                                                    max_force_criteria, 
+                                                                    0,
+                                                                    max_gaims_geoopt_steps,
+                                                                    database_size_limit,
+                                                                    -1,
+                                                                    machine_learning_fit_kwargs,
+                                                                    relax_calculator_kwargs,
+                                                                    calculator,
+                                                                    calculator_kwargs,
+                                                                    mlip=mlip,
+                                                                    gdiis_kwargs=gdiis_kwargs,
+                                                                    budget_kwargs=budget_kwargs,
+                                                                    symmetry=symmetry,
+                                                                    optimizer_kwargs=optimizer_kwargs,
+                                                                    cpu_parallel_fit_kwargs=cpu_parallel_fit_kwargs,
+                                                                    zero_shot_first_iteration=zero_shot_first_iteration,
+                                                                    stage_configs=stage_configs,
+                                                                    precision_kwargs=precision_kwargs,
+                                                                    reference_precision=precision,
+                                                                    graph_cache_dir=graph_cache_dir,
+                                                                    constraints=constraints,
+                                                                    )
+        route_job(job_check_convergence_and_next, "bookkeeping", stage_configs, dynamic=False, pass_manager_config=False)
         # ------------------------------------------------------------------
         # 2. Assemble seed flow
         # ------------------------------------------------------------------
 
-        jobs = [job_static, job_max_force, job_add_database, job_check_convergence_and_next]
+        jobs += [job_max_force, job_add_database, job_check_convergence_and_next]
         return Flow(jobs)
@@ -11,13 +11,88 @@ within a `jobflow.Flow`.  The typical workflow is:
     train/test EXTXYZ database, trimming it to a fixed size window.
 4.  *get_mace_relax_job* - spawn the next MACE-based relaxation, using the
     updated potential.
+
+``machine_learning_fit_in_process`` runs the MACE fine-tune with all CPU
+cores allocated to the job, a persistent cache of preprocessed training
+samples (``mace_graph_cache``) and / or the forces of constrained atoms
+masked out of the loss (``mace_force_mask``).
+
+For constrained inputs (``selective_dynamics``), *apply_constraints* restores
+the constraints on relaxation and reference outputs.
+
+``WarmStartForceFieldRelaxMaker`` lets successive ML relaxations reuse the
+optimiser state (e.g. the BFGS Hessian) of the previous one.
+
+``route_job`` attaches a per-stage ``jobflow_remote`` execution configuration
+(worker, resources, exec config) to a job.
+
+In symmetry mode *symmetrize_mol_or_struct* and *symmetrize_forces* keep the
+ML relaxed geometries and the reference forces in the symmetry of the input.
+
+For fast, deterministic CPU-only runs the module also provides stand-ins for
+both expensive stages: ``EMTStaticMaker`` as an analytic reference and
+``fit_harmonic_surrogate`` / ``get_surrogate_relax_job`` as a cheap fittable
+replacement for the MACE fit and relaxation.
+
+``evaluate_force_error`` measures the force error of each MLIP fit on its
+training data for the adaptive budgets, and ``select_gdiis_or_relaxed``
+optionally competes a GDIIS extrapolation over the stored reference geometries
+against the MLIP relaxation result.
 """
 
 
+from contextlib import contextmanager, ExitStack
+from dataclasses import dataclass
+import os
+from atomate2.ase.jobs import AseRelaxMaker, EmtRelaxMaker
+from atomate2.ase.utils import AseRelaxer
 from atomate2.forcefields.jobs import ForceFieldRelaxMaker
 from atomate2.forcefields import MLFF
 from jobflow import Flow, job, Response
+from autoplex.fitting.common.jobs import machine_learning_fit
+import logging
 import numpy as np
+from gaims_geoopt.calculators import HarmonicSurrogate, minimum_image_displacement
+from gaims_geoopt.symmetry import is_symmetry_equivalent, symmetrize_positions, symmetrize_vectors, with_positions
+
+STAGES = ("fit", "relax", "reference", "bookkeeping")
+
+def route_job(job_or_flow, stage, stage_configs, dynamic=True, pass_manager_config=True):
+    """Attach the execution configuration of ``stage`` to ``job_or_flow``.
+
+    Parameters
+    ----------
+    job_or_flow : jobflow.Job or jobflow.Flow
+        Job to configure; returned unchanged if there is nothing to do.
+    stage : str
+        One of ``STAGES``.
+    stage_configs : dict or None
+        Maps a stage to a dict with any of ``worker``, ``resources`` and
+        ``exec_config`` as accepted by ``jobflow_remote.set_run_config``.
+    dynamic : bool
+        Also apply the configuration to jobs generated by ``job_or_flow`` at
+        runtime (e.g. the relaxation spawned by ``get_mace_relax_job``).
+    pass_manager_config : bool
+        Let jobflow copy the configuration onto every job of a
+        ``Response`` flow.  Must be ``False`` for jobs whose response routes
+        its own jobs (``check_convergence_and_next``), as jobflow would
+        otherwise overwrite their stages.
+
+    Returns
+    -------
+    jobflow.Job or jobflow.Flow
+        ``job_or_flow``.
+    """
+
+    if stage not in STAGES:
+        raise ValueError(f"Unknown stage: {stage}, choose from {STAGES}")
+    if stage_configs is None or stage not in stage_configs:
+        return job_or_flow
+    manager_config = {key: value for key, value in stage_configs[stage].items() if value is not None}
+    job_or_flow.update_config(
+        {"manager_config": manager_config, "pass_manager_config": pass_manager_config}, dynamic=dynamic
+    )
+    return job_or_flow
 
 @job
 def evaluate_max_force(forces, molecule):
@@ -44,6 +119,44 @@ def evaluate_max_force(forces, molecule):
         constraint.adjust_forces(atoms, forces)
     return np.max(np.sum(forces**2, axis=1)**0.5)
 
+@job
+def evaluate_force_error(database_dict, mlip_output, mlip, relax_calculator_kwargs):
+    """Return the largest MLIP-vs-reference force error (eV/AA) of a fit.
+
+    The fitted MLIP is evaluated on the training configurations of
+    ``database_dict`` and compared with their ``REF_forces``; constraints are
+    projected out as in ``evaluate_max_force``.  (At the geometry the MLIP
+    has just been relaxed to its forces vanish, so the error there would only
+    repeat the reference ``max_force``.)
+
+    Parameters
+    ----------
+    database_dict : dict[str, list]
+        Database the MLIP was fitted on.
+    mlip_output : dict
+        Output of the MLIP fit.
+    mlip : str
+        ``"MACE"`` or ``"harmonic"``.
+    relax_calculator_kwargs : dict
+        Calculator options used for the MLIP relaxation.
+
+    Returns
+    -------
+    float
+        The maximum per-atom norm of the force difference.
+    """
+
+    calculator = get_mlip_calculator(mlip, mlip_output, relax_calculator_kwargs)
+    max_error = 0.0
+    for config in database_dict["train.extxyz"]:
+        atoms = config.to_ase_atoms()
+        atoms.calc = calculator
+        error = atoms.get_forces(apply_constraint=False) - np.array([site.properties["REF_forces"] for site in config.sites])
+        for constraint in atoms.constraints:
+            constraint.adjust_forces(atoms, error)
+        max_error = max(max_error, float(np.max(np.sum(error**2, axis=1)**0.5)))
+    return max_error
+
 @job
 def extract_mol_or_structure(mace_relax_output):
     """Extract the relaxed configuration (molecule **or** structure).
@@ -60,7 +173,35 @@ def extract_mol_or_structure(mace_relax_output):
         return mace_relax_output.structure
 
 @job
-def add_structure_database(database_dict, mol_or_struct, forces, database_size_limit = 10):
+def symmetrize_mol_or_struct(symmetry, mol_or_struct):
+    """Average the geometry over the symmetry operations of the input.
+
+    Removes the symmetry-breaking noise picked up during the MLIP relaxation.
+    """
+
+    return with_positions(mol_or_struct, symmetrize_positions(symmetry, mol_or_struct))
+
+@job
+def symmetrize_forces(symmetry, forces):
+    """Project reference forces (eV/AA) onto the symmetric subspace."""
+
+    return symmetrize_vectors(symmetry, forces).tolist()
+
+@job
+def apply_constraints(constraints, mol_or_struct):
+    """Copy ``mol_or_struct`` with the ``selective_dynamics`` of the input.
+
+    Relaxation and reference outputs do not reliably carry the site property,
+    so the constraints of the input are re-applied (atom order is preserved
+    throughout the loop).
+    """
+
+    mol_or_struct = mol_or_struct.copy()
+    mol_or_struct.add_site_property("selective_dynamics", constraints)
+    return mol_or_struct
+
+@job
+def add_structure_database(database_dict, mol_or_struct, forces, database_size_limit = 10, symmetry = None, precision = None, weight = None, constraints = None):
     """Append the configuration with reference data to an in-memory EXTXYZ db.
 
     The database is represented as a ``dict`` with two lists - ``"train.extxyz"``
@@ -78,6 +219,18 @@ def add_structure_database(database_dict, mol_or_struct, forces, database_size_l
         Reference forces (e.g. from first-principles) in eV/AA.
     database_size_limit : int, optional
         Maximum number of structures to retain in *each* list.
+    symmetry : dict, optional
+        Symmetry of the input (see ``gaims_geoopt.symmetry``).  If given, older
+        entries that are symmetry-equivalent to the new configuration are
+        dropped so the training set holds no duplicate information.
+    precision : str, optional
+        Precision level of the reference calculation, stored as
+        ``REF_precision``.
+    weight : float, optional
+        Training weight of the configuration, stored as ``config_weight``
+        (read by MACE).
+    constraints : list, optional
+        ``selective_dynamics`` of the input, stored on the entry.
 
     Returns
     -------
@@ -90,6 +243,17 @@ def add_structure_database(database_dict, mol_or_struct, forces, database_size_l
     mol_or_struct_copy.properties["REF_virial"] = [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
     for i in range(len(mol_or_struct)):
         mol_or_struct_copy.sites[i].properties["REF_forces"] = forces[i]
+    if precision is not None:
+        mol_or_struct_copy.properties["REF_precision"] = precision
+    if weight is not None:
+        mol_or_struct_copy.properties["config_weight"] = weight
+    if constraints is not None:
+        mol_or_struct_copy.add_site_property("selective_dynamics", constraints)
+    if symmetry is not None:
+        for key in ("train.extxyz", "test.extxyz"):
+            database_dict[key] = [
+                entry for entry in database_dict[key] if not is_symmetry_equivalent(symmetry, entry, mol_or_struct_copy)
+            ]
     database_dict["train.extxyz"].append(mol_or_struct_copy)
     database_dict["test.extxyz"].append(mol_or_struct_copy)
     while len(database_dict["train.extxyz"]) > database_size_limit:
@@ -98,15 +262,418 @@ def add_structure_database(database_dict, mol_or_struct, forces, database_size_l
         database_dict["test.extxyz"].pop(0)
     return database_dict
 
+# -----------------------------------------------------------------------------
+#  In-process MACE fitting (multi-core CPU, preprocessed graph cache)
+# -----------------------------------------------------------------------------
+
+def get_allocated_cores():
+    """Number of CPU cores allocated to the current job.
+
+    Uses the batch system's allocation (``SLURM_CPUS_PER_TASK``,
+    ``PBS_NUM_PPN``, ``NSLOTS``) if present, else the CPU affinity of the
+    process.
+    """
+
+    for variable in ("SLURM_CPUS_PER_TASK", "PBS_NUM_PPN", "NSLOTS"):
+        if os.environ.get(variable, "").isdigit():
+            return int(os.environ[variable])
+    return len(os.sched_getaffinity(0))
+
+def _hash_update(digest, value):
+    """Feed ``value`` (arrays, scalars, containers) into ``digest``."""
+
+    if isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode())
+            _hash_update(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_update(digest, item)
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        digest.update(repr(value).encode())
+
+def graph_cache_key(config, **from_config_kwargs):
+    """Content hash of a MACE ``Configuration`` and its preprocessing options.
+
+    Covers every field of the configuration (species, positions, cell, pbc,
+    reference properties and weights), the ``from_config`` arguments
+    (``z_table``, ``cutoff``, ``heads``), the MACE version and the torch
+    default dtype the tensors are built in, so a cached sample is only reused
+    if it would be rebuilt identically.
+    """
+
+    import hashlib
+    import mace
+    import torch
+
+    digest = hashlib.sha256(mace.__version__.encode())
+    digest.update(str(torch.get_default_dtype()).encode())
+    _hash_update(digest, dict(vars(config)))
+    for key, value in sorted(from_config_kwargs.items()):
+        digest.update(key.encode())
+        _hash_update(digest, list(value.zs) if hasattr(value, "zs") else value)
+    return digest.hexdigest()
+
+@contextmanager
+def mace_in_process():
+    """Run autoplex's MACE training in this process.
+
+    autoplex launches ``mace_run_train`` as a subprocess.  Inside the context
+    its ``run_mace`` calls ``mace.cli.run_train.run`` directly (writing the
+    same ``mace_train_out.log`` / ``mace_train_err.log``), so that patches
+    such as ``mace_graph_cache`` and ``mace_force_mask`` reach the training.
+    """
+
+    from contextlib import redirect_stderr, redirect_stdout
+    from autoplex.fitting.common import utils as autoplex_utils
+    from mace import tools
+    from mace.cli import run_train
+
+    run_mace = autoplex_utils.run_mace
+
+    def run_mace_in_process(hypers):
+        with (
+            open("mace_train_out.log", "w", encoding="utf-8") as file_std,
+            open("mace_train_err.log", "w", encoding="utf-8") as file_err,
+            redirect_stdout(file_std),
+            redirect_stderr(file_err),
+        ):
+            run_train.run(tools.build_default_arg_parser().parse_args(hypers))
+
+    autoplex_utils.run_mace = run_mace_in_process
+    try:
+        yield
+    finally:
+        autoplex_utils.run_mace = run_mace
+
+@contextmanager
+def mace_graph_cache(cache_dir):
+    """Persistent cache of preprocessed MACE training samples.
+
+    Inside the context ``mace.data.AtomicData.from_config`` (neighbour list,
+    one-hot species, reference tensors) looks up ``<graph_cache_key>.pt`` in
+    ``cache_dir`` before building a sample.  Use within ``mace_in_process``.
+    The hit / miss counts are logged.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Cache directory, shared by all fits of a run (on a filesystem visible
+        to every fit worker).
+    """
+
+    import torch
+    from mace.data import AtomicData
+
+    os.makedirs(cache_dir, exist_ok=True)
+    from_config = AtomicData.__dict__["from_config"]
+    build = AtomicData.from_config
+    counts = {"hits": 0, "misses": 0}
+
+    def cached_from_config(config, **kwargs):
+        path = os.path.join(cache_dir, f"{graph_cache_key(config, **kwargs)}.pt")
+        if os.path.isfile(path):
+            counts["hits"] += 1
+            return torch.load(path, weights_only=False)
+        counts["misses"] += 1
+        data = build(config, **kwargs)
+        # Write-then-rename so concurrent fits never read a partial file.
+        torch.save(data, f"{path}.{os.getpid()}.tmp")
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        return data
+
+    AtomicData.from_config = staticmethod(cached_from_config)
+    try:
+        yield counts
+    finally:
+        AtomicData.from_config = from_config
+        logging.info(f"MACE graph cache {cache_dir}: {counts['hits']} hits, {counts['misses']} misses")
+
+@contextmanager
+def mace_force_mask(constrained_mol_or_struct):
+    """Drop the forces of constrained atoms from in-process MACE fits.
+
+    MACE only has per-configuration loss weights.  Inside the context (use
+    within ``mace_in_process``) every sample gets a per-atom ``forces_mask``:
+    the ``selective_dynamics`` flags of ``constrained_mol_or_struct`` for
+    configurations with the same atomic numbers, all ``True`` otherwise
+    (e.g. foundation-model replay data).  The loss then replaces the reference
+    forces of masked components by the detached prediction, so they carry
+    zero error and zero gradient.
+
+    Parameters
+    ----------
+    constrained_mol_or_struct : Structure or Molecule
+        Configuration with the ``selective_dynamics`` site property.
+    """
+
+    import torch
+    from mace.cli import run_train
+    from mace.data import AtomicData
+
+    atomic_numbers = list(constrained_mol_or_struct.atomic_numbers)
+    mask = np.array(constrained_mol_or_struct.site_properties["selective_dynamics"], dtype=bool)
+    from_config = AtomicData.__dict__["from_config"]
+    build = AtomicData.from_config
+    get_loss_fn = run_train.get_loss_fn
+
+    def masked_from_config(config, **kwargs):
+        data = build(config, **kwargs)
+        if list(config.atomic_numbers) == atomic_numbers:
+            data.forces_mask = torch.tensor(mask)
+        else:
+            data.forces_mask = torch.ones((len(config.atomic_numbers), 3), dtype=torch.bool)
+        return data
+
+    def masked_get_loss_fn(*args, **kwargs):
+        loss_fn = get_loss_fn(*args, **kwargs)
+        forward = loss_fn.forward
+
+        def masked_forward(ref, pred):
+            if pred.get("forces") is not None and ref.forces is not None:
+                # The batch is rebuilt by the data loader, so it can be modified.
+                ref.forces = torch.where(ref.forces_mask, ref.forces, pred["forces"].detach())
+            return forward(ref, pred)
+
+        loss_fn.forward = masked_forward
+        return loss_fn
+
+    logging.info(f"Masking the forces of {int(np.sum(~mask.all(axis=1)))} constrained atoms in the MACE loss")
+    AtomicData.from_config = staticmethod(masked_from_config)
+    run_train.get_loss_fn = masked_get_loss_fn
+    try:
+        yield
+    finally:
+        AtomicData.from_config = from_config
+        run_train.get_loss_fn = get_loss_fn
+
+@contextmanager
+def mace_cpu_threads(num_threads, in_process=False):
+    """Give the MACE fit ``num_threads`` CPU threads, restoring them afterwards.
+
+    autoplex trains MACE in a ``mace_run_train`` subprocess, which inherits
+    ``OMP_NUM_THREADS`` / ``MKL_NUM_THREADS``.  With ``in_process`` (see
+    ``mace_in_process``) torch is already initialised in this process, so
+    ``torch.set_num_threads`` is used as well.
+    """
+
+    variables = ("OMP_NUM_THREADS", "MKL_NUM_THREADS")
+    environ = {variable: os.environ.get(variable) for variable in variables}
+    for variable in variables:
+        os.environ[variable] = str(num_threads)
+    torch_threads = None
+    if in_process:
+        import torch
+
+        torch_threads = torch.get_num_threads()
+        torch.set_num_threads(num_threads)
+    try:
+        yield
+    finally:
+        for variable, value in environ.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+        if torch_threads is not None:
+            torch.set_num_threads(torch_threads)
+
+@job
+def machine_learning_fit_in_process(cpu_parallel=False, num_threads=None, graph_cache_dir=None, constrained_mol_or_struct=None, **machine_learning_fit_kwargs):
+    """Run ``machine_learning_fit`` with tuned threading, caching and masking.
+
+    MACE's distributed training only supports the NCCL (GPU) backend, so CPU
+    nodes are used through torch's intra-op parallelism instead
+    (``mace_cpu_threads``).  Combine with a ``batch_size`` larger than 1 so
+    each step has enough work for all threads.  The graph cache and the
+    force mask need MACE to train in this process (``mace_in_process``);
+    otherwise autoplex's ``mace_run_train`` subprocess is used.
+
+    Parameters
+    ----------
+    cpu_parallel : bool
+        Spread the fit over ``num_threads`` CPU threads.
+    num_threads : int, optional
+        Number of threads; defaults to ``get_allocated_cores()``.
+    graph_cache_dir : str, optional
+        Directory of the preprocessed-data cache, see ``mace_graph_cache``.
+        Successive fits then only preprocess configurations that are new to
+        the database.
+    constrained_mol_or_struct : Structure or Molecule, optional
+        Configuration whose ``selective_dynamics`` flags mask the force loss,
+        see ``mace_force_mask``.
+    **machine_learning_fit_kwargs
+        Forwarded to ``machine_learning_fit``.
+
+    Returns
+    -------
+    dict
+        Output of ``machine_learning_fit``.
+    """
+
+    in_process = graph_cache_dir is not None or constrained_mol_or_struct is not None
+    with ExitStack() as stack:
+        if cpu_parallel:
+            if num_threads is None:
+                num_threads = get_allocated_cores()
+            logging.info(
+                f"MACE fit on {num_threads} CPU threads ({'in-process' if in_process else 'mace_run_train subprocess'}) with batch_size: {machine_learning_fit_kwargs.get('batch_size')}"
+            )
+            stack.enter_context(mace_cpu_threads(num_threads, in_process))
+        if in_process:
+            stack.enter_context(mace_in_process())
+        if graph_cache_dir is not None:
+            stack.enter_context(mace_graph_cache(graph_cache_dir))
+        if constrained_mol_or_struct is not None:
+            stack.enter_context(mace_force_mask(constrained_mol_or_struct))
+        return machine_learning_fit.original(**machine_learning_fit_kwargs)
+
+# -----------------------------------------------------------------------------
+#  Optimiser state carried across ML relaxations
+# -----------------------------------------------------------------------------
+
+OPTIMIZER_STATE_FILE = "optimizer_state.json"
+WARM_START_OPTIMIZERS = ("BFGS", "LBFGS")
+
+def get_optimizer_class(optimizer, warm_start=False):
+    """Return the ASE optimiser class for ``optimizer``.
+
+    Only ``WARM_START_OPTIMIZERS`` can be warm-started: ASE's FIRE resets the
+    restored time step in its constructor and the Precon optimisers skip part
+    of their initialisation when restarting, so ``warm_start`` raises a
+    ``ValueError`` for them.
+    """
+
+    from ase.optimize import BFGS, FIRE, LBFGS
+    from ase.optimize.precon import PreconFIRE, PreconLBFGS
+
+    optimizers = {"BFGS": BFGS, "LBFGS": LBFGS, "FIRE": FIRE, "PreconLBFGS": PreconLBFGS, "PreconFIRE": PreconFIRE}
+    if optimizer not in optimizers:
+        raise ValueError(f"Unknown optimizer: {optimizer}, choose from {list(optimizers)}")
+    if warm_start and optimizer not in WARM_START_OPTIMIZERS:
+        raise ValueError(f"Warm start is not supported for {optimizer}, choose from {list(WARM_START_OPTIMIZERS)}")
+    return optimizers[optimizer]
+
+def adjust_optimizer_state(optimizer, state, atoms):
+    """Adapt a saved ASE optimiser state to the updated potential.
+
+    The curvature information (BFGS Hessian, LBFGS ``s``/``y`` pairs) is
+    kept.  The forces (and energy) tied to the *old* model are recomputed at
+    the stored reference position with the calculator attached to ``atoms``.
+
+    Parameters
+    ----------
+    optimizer : str
+        Optimiser name, one of ``WARM_START_OPTIMIZERS``.
+    state : tuple
+        Content of the ASE ``restart`` file of the previous relaxation.
+    atoms : :class:`ase.Atoms`
+        Starting configuration with the new calculator attached.
+
+    Returns
+    -------
+    tuple or None
+        The adjusted state, or ``None`` if it does not fit ``atoms``.
+    """
+
+    def new_model_forces(positions):
+        atoms_copy = atoms.copy()
+        atoms_copy.calc = atoms.calc
+        atoms_copy.set_positions(np.reshape(positions, (-1, 3)))
+        return atoms_copy.get_forces(), atoms_copy.get_potential_energy()
+
+    n_dof = 3 * len(atoms)
+    if optimizer == "BFGS":
+        hessian, pos0, _, maxstep = state[:4]
+        if hessian is None or np.shape(hessian) != (n_dof, n_dof) or pos0 is None:
+            return None
+        return (hessian, pos0, new_model_forces(pos0)[0].reshape(-1), maxstep)
+    iteration, s, y, rho, r0, _, _, task = state
+    if r0 is None or np.size(r0) != n_dof:
+        return None
+    forces, energy = new_model_forces(r0)
+    return (iteration, s, y, rho, r0, forces.reshape(np.shape(r0)), energy, task)
+
+@dataclass
+class WarmStartForceFieldRelaxMaker(ForceFieldRelaxMaker):
+    """``ForceFieldRelaxMaker`` with a selectable optimiser and warm start.
+
+    The ASE ``restart`` file of the optimiser is written to the job directory.
+    If ``warm_start`` is set and ``prev_dir`` (the directory of the previous
+    ML relaxation) holds such a file, it is adjusted to the current model by
+    ``adjust_optimizer_state`` and used to initialise the optimiser.  Off by
+    default: on a changing MLIP the carried curvature can cost more steps
+    than it saves.
+    """
+
+    optimizer: str = "BFGS"
+    warm_start: bool = False
+
+    def run_ase(self, mol_or_struct, prev_dir=None):
+        """Run the relaxation, warm-starting from ``prev_dir`` if possible."""
+        return run_warm_start_relax(self, mol_or_struct, prev_dir)
+
+def run_warm_start_relax(maker, mol_or_struct, prev_dir=None):
+    """Relax ``mol_or_struct`` with ``maker``'s optimiser and saved state."""
+
+    from ase.io.jsonio import read_json, write_json
+    from atomate2.utils.path import strip_hostname
+
+    optimizer_class = get_optimizer_class(maker.optimizer, maker.warm_start)
+    calculator = maker.calculator
+    state = None
+    if maker.warm_start and prev_dir is not None:
+        state_file = os.path.join(strip_hostname(str(prev_dir)), OPTIMIZER_STATE_FILE)
+        if os.path.isfile(state_file):
+            with open(state_file) as fd:
+                state = read_json(fd, always_array=False)
+            atoms = mol_or_struct.to_ase_atoms()
+            atoms.calc = calculator
+            state = adjust_optimizer_state(maker.optimizer, state, atoms)
+    # ASE restarts from any state file in the working directory, so only
+    # the adjusted state may be left there (jobs can share a directory).
+    if os.path.isfile(OPTIMIZER_STATE_FILE):
+        os.remove(OPTIMIZER_STATE_FILE)
+    if state is not None:
+        logging.info(f"Warm-starting {maker.optimizer} from {state_file}")
+        with open(OPTIMIZER_STATE_FILE, "w") as fd:
+            write_json(fd, state)
+
+    relax_kwargs = {"restart": OPTIMIZER_STATE_FILE}
+    relax_kwargs.update(maker.relax_kwargs)
+    return AseRelaxer(
+        calculator=calculator,
+        optimizer=optimizer_class,
+        relax_cell=maker.relax_cell,
+        **maker.optimizer_kwargs,
+    ).relax(mol_or_struct, steps=maker.steps, **relax_kwargs)
+
+def get_mace_model(mlip_output):
+    """Return the MACE model of ``mlip_output`` for the ASE calculator.
+
+    This is the compiled fine-tuned model, or the ``foundation_model`` (name
+    or path) if nothing has been fitted yet (``mlip_path`` is ``None``).
+    """
+
+    if mlip_output["mlip_path"] is None:
+        return mlip_output["foundation_model"]
+    return f'{mlip_output["mlip_path"][0]}/MACE_compiled.model'
+
 @job
-def get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs):
+def get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs, fmax=None, optimizer_kwargs=None, prev_dir=None):
     """Create a *new* MACE relaxation job using the fine-tuned MLIP model.
 
     Parameters
     ----------
     mlip_output : dict
         Output of a previous MLIP training flow containing the ``mlip_path`` key
-        that points to the directory where the compiled MACE model lives.
+        that points to the directory where the compiled MACE model lives.  A
+        ``mlip_path`` of ``None`` relaxes on ``mlip_output["foundation_model"]``
+        instead (zero-shot).
     struct : Structure or Molecule
         Atomic configuration to relax.
     max_force_criteria : float
@@ -115,6 +682,16 @@ def get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator
         Extra keyword arguments forwarded to ASE's ``BFGS`` optimizer via
         ``Atomate2``.  If ``"max_steps"`` is supplied it will override the
         default value of *500*.
+    fmax : float, optional
+        Force threshold (eV/AA) of the relaxation.  Defaults to
+        ``max_force_criteria/10``.
+    optimizer_kwargs : dict, optional
+        ``None`` keeps atomate2's default optimiser.  Otherwise ``optimizer``
+        (``"BFGS"``, ``"LBFGS"``, ``"FIRE"``, ``"PreconLBFGS"`` or
+        ``"PreconFIRE"``) and ``warm_start`` configure a
+        ``WarmStartForceFieldRelaxMaker``.
+    prev_dir : str, optional
+        Directory of the previous ML relaxation to warm-start from.
 
     Returns
     -------
@@ -127,14 +704,290 @@ def get_mace_relax_job(mlip_output, struct, max_force_criteria, relax_calculator
     if "max_steps" in relax_calculator_kwargs:
         steps = relax_calculator_kwargs["max_steps"]
         del relax_calculator_kwargs["max_steps"]
-    calculator_kwargs = {'model':f'{mlip_output["mlip_path"][0]}/MACE_compiled.model'}
+    calculator_kwargs = {'model':get_mace_model(mlip_output)}
     calculator_kwargs.update(relax_calculator_kwargs)
-    mace_maker = ForceFieldRelaxMaker(
+    maker_kwargs = {}
+    maker_class = ForceFieldRelaxMaker
+    if optimizer_kwargs is not None:
+        maker_class = WarmStartForceFieldRelaxMaker
+        maker_kwargs = optimizer_kwargs
+    mace_maker = maker_class(
         force_field_name = MLFF.MACE,
         relax_cell = False,
         steps=steps,
         calculator_kwargs = calculator_kwargs,
-        relax_kwargs = {'fmax':max_force_criteria/10})
-    job_relax = mace_maker.make(struct)
+        relax_kwargs = {'fmax':max_force_criteria/10 if fmax is None else fmax},
+        **maker_kwargs)
+    job_relax = mace_maker.make(struct, prev_dir=prev_dir)
     flow = Flow([job_relax,])
     return Response(replace=flow, output=job_relax.output)
+
+
+# -----------------------------------------------------------------------------
+#  Stand-in reference and MLIP backends
+# -----------------------------------------------------------------------------
+
+@dataclass
+class EMTStaticMaker(EmtRelaxMaker):
+    """Single-point ASE EMT calculation used as an analytic reference."""
+
+    name: str = "EMT static"
+    steps: int = 1
+    relax_cell: bool = False
+
+@dataclass
+class SurrogateRelaxMaker(AseRelaxMaker):
+    """Relax a configuration on the ``HarmonicSurrogate`` potential."""
+
+    name: str = "Harmonic surrogate relax"
+    relax_cell: bool = False
+    optimizer: str = "BFGS"
+    warm_start: bool = False
+
+    @property
+    def calculator(self):
+        """Harmonic surrogate calculator."""
+        return HarmonicSurrogate(**self.calculator_kwargs)
+
+    def run_ase(self, mol_or_struct, prev_dir=None):
+        """Run the relaxation, warm-starting from ``prev_dir`` if requested."""
+        return run_warm_start_relax(self, mol_or_struct, prev_dir)
+
+@job
+def fit_harmonic_surrogate(database_dict, ref_energy_name="REF_energy", ref_force_name="REF_forces", default_curvature=10.0, min_curvature=0.1, max_curvature=1000.0):
+    """Fit a ``HarmonicSurrogate`` to the in-memory EXTXYZ database.
+
+    The surrogate is anchored at the most recent training configuration.  Its
+    isotropic curvature is the least-squares solution of
+    ``F_i - F_a = -k (x_i - x_a)`` over all other configurations of the same
+    size.  With a single configuration, or a non-positive fit, the curvature
+    falls back to ``default_curvature``.
+
+    Parameters
+    ----------
+    database_dict : dict[str, list]
+        Running in-memory database with keys ``train.extxyz`` and ``test.extxyz``.
+    ref_energy_name, ref_force_name : str
+        Names of the reference energy / forces properties.
+    default_curvature : float
+        Curvature (eV/AA^2) used when it cannot be fitted.
+    min_curvature, max_curvature : float
+        Bounds applied to the fitted curvature.
+
+    Returns
+    -------
+    dict
+        ``mlip_path`` (always ``None``, there is no model on disk) and the
+        ``calculator_kwargs`` of the fitted surrogate.
+    """
+
+    configs = database_dict["train.extxyz"]
+    anchor = configs[-1]
+    anchor_atoms = anchor.to_ase_atoms()
+    anchor_positions = anchor_atoms.get_positions()
+    anchor_forces = np.array([site.properties[ref_force_name] for site in anchor.sites])
+
+    numerator = 0.0
+    denominator = 0.0
+    for config in configs[:-1]:
+        if len(config) != len(anchor):
+            continue
+        atoms = config.to_ase_atoms()
+        displacement = minimum_image_displacement(atoms, anchor_positions)
+        forces = np.array([site.properties[ref_force_name] for site in config.sites])
+        numerator -= np.sum((forces - anchor_forces) * displacement)
+        denominator += np.sum(displacement**2)
+
+    curvature = default_curvature
+    if denominator > 0.0 and numerator > 0.0:
+        curvature = float(np.clip(numerator / denominator, min_curvature, max_curvature))
+
+    return {
+        "mlip_path": None,
+        "calculator_kwargs": {
+            "anchor_positions": anchor_positions.tolist(),
+            "anchor_forces": anchor_forces.tolist(),
+            "anchor_energy": float(anchor.properties[ref_energy_name]),
+            "curvature": curvature,
+        },
+    }
+
+@job
+def get_surrogate_relax_job(mlip_output, struct, max_force_criteria, relax_calculator_kwargs, fmax=None, optimizer_kwargs=None, prev_dir=None):
+    """Create a relaxation job on the fitted ``HarmonicSurrogate``.
+
+    Mirrors ``get_mace_relax_job``.  Only ``"max_steps"`` is read from
+    ``relax_calculator_kwargs``; the remaining MACE-specific options (device,
+    cuEquivariance, ...) do not apply to the surrogate and are ignored.
+    ``optimizer_kwargs`` and ``prev_dir`` are as in ``get_mace_relax_job``.
+    """
+
+    steps = relax_calculator_kwargs.get("max_steps", 500)
+    surrogate_maker = SurrogateRelaxMaker(
+        steps=steps,
+        calculator_kwargs=mlip_output["calculator_kwargs"],
+        relax_kwargs={'fmax':max_force_criteria/10 if fmax is None else fmax},
+        **(optimizer_kwargs or {}))
+    job_relax = surrogate_maker.make(struct, prev_dir=prev_dir)
+    flow = Flow([job_relax,])
+    return Response(replace=flow, output=job_relax.output)
+
+
+# -----------------------------------------------------------------------------
+#  History-based (GDIIS) step proposer
+# -----------------------------------------------------------------------------
+
+def gdiis_extrapolate(positions, forces, curvature=70.0, max_coefficient_sum=10.0):
+    """Geometry DIIS extrapolation from a history of positions and forces.
+
+    The coefficients ``c`` minimise ``|sum_i c_i F_i|`` subject to
+    ``sum_i c_i = 1``; the proposed geometry is
+    ``sum_i c_i x_i + sum_i c_i F_i / curvature``, i.e. a steepest-descent step
+    with an isotropic inverse Hessian taken from the interpolated point.
+
+    Parameters
+    ----------
+    positions, forces : array_like
+        History of Cartesian positions and forces (shape: ``(n_hist, n_atoms, 3)``).
+    curvature : float
+        Isotropic Hessian estimate (eV/AA^2); 70 is ASE's BFGS default.
+    max_coefficient_sum : float
+        Reject ill-conditioned extrapolations with ``sum_i |c_i|`` above this.
+
+    Returns
+    -------
+    numpy.ndarray or None
+        Proposed positions, or ``None`` if there is not enough history or the
+        extrapolation is rejected.
+    """
+
+    positions = np.asarray(positions, dtype=float)
+    forces = np.asarray(forces, dtype=float)
+    n_hist = len(positions)
+    if n_hist < 2:
+        return None
+    errors = forces.reshape(n_hist, -1)
+    b_matrix = np.ones((n_hist + 1, n_hist + 1))
+    b_matrix[:n_hist, :n_hist] = errors @ errors.T
+    b_matrix[n_hist, n_hist] = 0.0
+    rhs = np.zeros(n_hist + 1)
+    rhs[n_hist] = 1.0
+    coefficients = np.linalg.lstsq(b_matrix, rhs, rcond=None)[0][:n_hist]
+    if np.sum(np.abs(coefficients)) > max_coefficient_sum:
+        return None
+    return np.tensordot(coefficients, positions + forces / curvature, axes=1)
+
+def secant_hessian(positions, forces, curvature=70.0):
+    """Hessian estimate from BFGS secant updates over a position/force history.
+
+    Starts from the isotropic ``curvature`` and applies one BFGS update per
+    consecutive pair of the history, skipping pairs without positive
+    curvature along the step.
+
+    Parameters
+    ----------
+    positions, forces : array_like
+        History of Cartesian positions and forces (shape: ``(n_hist, n_atoms, 3)``).
+    curvature : float
+        Initial isotropic Hessian (eV/AA^2).
+
+    Returns
+    -------
+    numpy.ndarray
+        Hessian estimate of shape ``(3 * n_atoms, 3 * n_atoms)``.
+    """
+
+    positions = np.asarray(positions, dtype=float).reshape(len(positions), -1)
+    forces = np.asarray(forces, dtype=float).reshape(len(forces), -1)
+    hessian = curvature * np.eye(positions.shape[1])
+    for i in range(1, len(positions)):
+        step = positions[i] - positions[i - 1]
+        gradient_change = forces[i - 1] - forces[i]
+        if step @ gradient_change <= 1e-8:
+            continue
+        hessian_step = hessian @ step
+        hessian += np.outer(gradient_change, gradient_change) / (gradient_change @ step) - np.outer(hessian_step, hessian_step) / (step @ hessian_step)
+    return hessian
+
+def get_mlip_calculator(mlip, mlip_output, relax_calculator_kwargs):
+    """Return the ASE calculator of the fitted MLIP (``"MACE"`` or ``"harmonic"``)."""
+
+    if mlip == "harmonic":
+        return HarmonicSurrogate(**mlip_output["calculator_kwargs"])
+    from atomate2.forcefields.utils import ase_calculator
+
+    calculator_kwargs = {'model':get_mace_model(mlip_output)}
+    calculator_kwargs.update({key: value for key, value in relax_calculator_kwargs.items() if key != "max_steps"})
+    return ase_calculator(MLFF.MACE, **calculator_kwargs)
+
+@job
+def select_gdiis_or_relaxed(database_dict, relaxed_mol_or_struct, gdiis_kwargs):
+    """Compete a GDIIS proposal against the MLIP-relaxed geometry.
+
+    The GDIIS step uses the most recent reference geometries and
+    ``REF_forces`` of ``database_dict["train.extxyz"]``.  The proposal is only
+    considered if no atom moves more than ``trust_radius`` from the latest
+    reference geometry.  Both candidates are then scored with a quadratic
+    model of the *reference* energy around the latest reference geometry,
+    ``-F . d + d . H . d / 2``, whose Hessian ``H`` comes from
+    ``secant_hessian`` over the same history, and the lower one is chosen.
+
+    Parameters
+    ----------
+    database_dict : dict[str, list]
+        Running in-memory database with keys ``train.extxyz`` and ``test.extxyz``.
+    relaxed_mol_or_struct : Structure or Molecule
+        Output geometry of the MLIP relaxation.
+    gdiis_kwargs : dict
+        ``history`` (default 5), ``trust_radius`` (AA, default 0.2) and any
+        keyword of ``gdiis_extrapolate``; its ``curvature`` is also the
+        initial Hessian of the model.
+
+    Returns
+    -------
+    Structure or Molecule
+        The selected geometry.
+    """
+
+    gdiis_kwargs = dict(gdiis_kwargs)
+    history = gdiis_kwargs.pop("history", 5)
+    trust_radius = gdiis_kwargs.pop("trust_radius", 0.2)
+
+    configs = [
+        config for config in database_dict["train.extxyz"] if len(config) == len(relaxed_mol_or_struct)
+    ][-history:]
+    if len(configs) < 2:
+        return relaxed_mol_or_struct
+    latest_positions = configs[-1].to_ase_atoms().get_positions()
+    positions = [
+        latest_positions + minimum_image_displacement(config.to_ase_atoms(), latest_positions) for config in configs
+    ]
+    forces = [[site.properties["REF_forces"] for site in config.sites] for config in configs]
+    proposal = gdiis_extrapolate(positions, forces, **gdiis_kwargs)
+    if proposal is None:
+        logging.info("GDIIS extrapolation rejected (ill-conditioned history).")
+        return relaxed_mol_or_struct
+
+    relaxed_atoms = relaxed_mol_or_struct.to_ase_atoms()
+    gdiis_atoms = relaxed_atoms.copy()
+    gdiis_atoms.set_positions(proposal, apply_constraint=True)
+    gdiis_step = minimum_image_displacement(gdiis_atoms, latest_positions)
+    max_step = np.max(np.linalg.norm(gdiis_step, axis=1))
+    if max_step > trust_radius:
+        logging.info(f"GDIIS proposal outside trust radius: {max_step} > {trust_radius}")
+        return relaxed_mol_or_struct
+
+    hessian = secant_hessian(positions, forces, gdiis_kwargs.get("curvature", 70.0))
+    latest_forces = np.ravel(forces[-1])
+
+    def model_energy(step):
+        step = np.ravel(step)
+        return -latest_forces @ step + 0.5 * step @ hessian @ step
+
+    relaxed_energy = model_energy(minimum_image_displacement(relaxed_atoms, latest_positions))
+    gdiis_energy = model_energy(gdiis_step)
+    if gdiis_energy < relaxed_energy:
+        logging.info(f"GDIIS proposal selected with model energy {gdiis_energy} < {relaxed_energy}")
+        return type(relaxed_mol_or_struct).from_ase_atoms(gdiis_atoms)
+    logging.info(f"MLIP relaxation selected with model energy {relaxed_energy} <= {gdiis_energy}")
+    return relaxed_mol_or_struct
@@ -0,0 +1,238 @@
+"""
+Per-iteration schedules for the GAIMS active-learning loop.
+
+The functions in this module are plain Python helpers (not jobs).  They are
+evaluated inside ``check_convergence_and_next`` once the statistics of the
+previous iteration are known, and every decision is logged so that a run can
+be audited afterwards.
+
+* ``epochs_for_batch_size`` - epoch budgets rescaled so that a larger
+  batch size keeps the number of optimiser updates.
+* ``adaptive_budgets`` - MACE fit epochs / patience and ML relaxation
+  ``fmax`` / steps from the previous model error, the database size and the
+  distance to convergence.
+* ``reference_precision_level`` / ``reference_precision_params`` - loose
+  FHI-aims SCF (and optionally k-grid) settings far from convergence, the
+  user's settings near it.
+"""
+
+
+import logging
+import numpy as np
+
+ADAPTIVE_BUDGETS_DEFAULT = {
+    "min_epochs": 50,
+    "max_epochs": 1000,
+    "min_relax_steps": 50,
+    "max_relax_steps": 500,
+    "far_force_ratio": 100.0,
+    "fmax_error_fraction": 0.5,
+}
+
+
+def convergence_closeness(max_force, max_force_criteria, far_force_ratio=100.0):
+    """Map the distance to convergence onto ``[0, 1]``.
+
+    ``0`` means ``max_force`` is ``far_force_ratio`` times (or more) above
+    ``max_force_criteria``; ``1`` means it is at the criterion.  The scale is
+    logarithmic in ``max_force / max_force_criteria``.
+    """
+
+    ratio = max(max_force / max_force_criteria, 1.0)
+    return float(np.clip(1.0 - np.log(ratio) / np.log(far_force_ratio), 0.0, 1.0))
+
+
+def epochs_for_batch_size(epochs, database_size, batch_size, base_batch_size=1):
+    """Rescale an epoch budget set for ``base_batch_size`` to ``batch_size``.
+
+    An epoch is ``ceil(database_size / batch_size)`` optimiser updates, so a
+    larger batch gives fewer updates per epoch; the returned number of epochs
+    keeps the total number of updates of ``epochs`` at ``base_batch_size``.
+    """
+
+    database_size = max(database_size, 1)
+    updates = epochs * int(np.ceil(database_size / base_batch_size))
+    updates_per_epoch = int(np.ceil(database_size / batch_size))
+    scaled_epochs = int(np.ceil(updates / updates_per_epoch))
+    logging.info(
+        f"Fit epochs: {scaled_epochs} at batch size {batch_size} for {epochs} at batch size {base_batch_size} ({updates} updates, database size: {database_size})"
+    )
+    return scaled_epochs
+
+def adaptive_budgets(max_force, max_force_criteria, force_error, database_size, budget_kwargs, batch_size=1):
+    """Choose the fit and relaxation budgets of the next iteration.
+
+    * The fit budget, in epochs at batch size 1, grows from ``min_epochs``
+      far from convergence to ``max_epochs`` at convergence (by default
+      above the fixed budget of 500 epochs once ``max_force`` is within about
+      ten times ``max_force_criteria``) and is doubled when the force error
+      of the last fit on its training data exceeded the reference
+      ``max_force`` (the model could not resolve the remaining forces).
+      ``epochs_for_batch_size`` turns it into ``max_num_epochs`` at
+      ``batch_size`` with the same number of optimiser updates.
+      ``patience`` equals ``max_num_epochs``.
+    * The relaxation ``fmax`` is never tighter than the model can resolve:
+      ``fmax_error_fraction * force_error``, bounded to
+      ``[max_force_criteria/10, max_force_criteria]``.
+    * The relaxation steps grow from ``min_relax_steps`` to
+      ``max_relax_steps`` with the closeness to convergence.
+
+    Parameters
+    ----------
+    max_force : float
+        Maximum reference force (eV/AA) of the last iteration.
+    max_force_criteria : float
+        Target convergence threshold (eV/AA).
+    force_error : float or None
+        Maximum MLIP-vs-reference force error (eV/AA) of the last fit over its
+        training configurations; ``None`` on the first iteration.
+    database_size : int
+        Number of training configurations.
+    budget_kwargs : dict
+        Overrides of ``ADAPTIVE_BUDGETS_DEFAULT``.
+    batch_size : int
+        Training batch size of the MACE fit.
+
+    Returns
+    -------
+    dict
+        ``max_num_epochs``, ``patience``, ``fmax`` and ``max_steps``.
+    """
+
+    settings = dict(ADAPTIVE_BUDGETS_DEFAULT)
+    settings.update(budget_kwargs)
+
+    closeness = convergence_closeness(max_force, max_force_criteria, settings["far_force_ratio"])
+    epochs = int(round(settings["min_epochs"] + (settings["max_epochs"] - settings["min_epochs"]) * closeness))
+    if force_error is not None and force_error > max_force:
+        epochs *= 2
+    epochs = epochs_for_batch_size(epochs, database_size, batch_size)
+
+    fmax = max_force_criteria / 10
+    if force_error is not None:
+        fmax = float(np.clip(settings["fmax_error_fraction"] * force_error, max_force_criteria / 10, max_force_criteria))
+
+    steps = int(round(
+        settings["min_relax_steps"] + (settings["max_relax_steps"] - settings["min_relax_steps"]) * closeness
+    ))
+
+    budgets = {"max_num_epochs": epochs, "patience": epochs, "fmax": fmax, "max_steps": steps}
+    logging.info(
+        f"Adaptive budgets: {budgets} from max_force: {max_force}, max_force_criteria: {max_force_criteria}, force_error: {force_error}, database size: {database_size}, closeness: {closeness:.3f}"
+    )
+    return budgets
+
+
+
+REFERENCE_PRECISION_DEFAULT = {
+    "loose_force_ratio": 10.0,
+    "medium_force_ratio": 3.0,
+    "initial_level": "loose",
+    "levels": {
+        "loose": {"sc_accuracy_rho": 1e-4, "sc_accuracy_eev": 1e-2, "sc_accuracy_etot": 1e-4},
+        "medium": {"sc_accuracy_rho": 1e-5, "sc_accuracy_eev": 1e-3, "sc_accuracy_etot": 1e-5},
+        "tight": {},
+    },
+    "force_accuracy_fraction": 0.01,
+    "k_grid_scale": {"loose": 1.0, "medium": 1.0, "tight": 1.0},
+    "weights": {"loose": 0.5, "medium": 0.8, "tight": 1.0},
+}
+
+
+def _precision_settings(precision_kwargs):
+    """``REFERENCE_PRECISION_DEFAULT`` with ``precision_kwargs`` merged in.
+
+    ``levels``, ``k_grid_scale`` and ``weights`` are merged key by key (and
+    each level's parameters key by key), so overriding one entry keeps the
+    defaults of the others.
+    """
+
+    settings = dict(REFERENCE_PRECISION_DEFAULT)
+    for key, value in precision_kwargs.items():
+        if key == "levels":
+            levels = dict(REFERENCE_PRECISION_DEFAULT["levels"])
+            for level, params in value.items():
+                levels[level] = {**levels.get(level, {}), **params}
+            settings["levels"] = levels
+        elif key in ("k_grid_scale", "weights"):
+            settings[key] = {**REFERENCE_PRECISION_DEFAULT[key], **value}
+        else:
+            settings[key] = value
+    return settings
+
+
+def reference_precision_level(max_force, max_force_criteria, precision_kwargs):
+    """Choose the precision level of the next reference calculation.
+
+    ``"loose"`` while ``max_force`` is at least ``loose_force_ratio`` times
+    ``max_force_criteria``, ``"medium"`` down to ``medium_force_ratio`` times,
+    and ``"tight"`` (the user's own settings) below.  ``max_force`` of
+    ``None`` (no reference yet) gives ``initial_level``.
+    """
+
+    settings = _precision_settings(precision_kwargs)
+    if max_force is None:
+        level = settings["initial_level"]
+    elif max_force >= settings["loose_force_ratio"] * max_force_criteria:
+        level = "loose"
+    elif max_force >= settings["medium_force_ratio"] * max_force_criteria:
+        level = "medium"
+    else:
+        level = "tight"
+    logging.info(f"Reference precision: {level} from max_force: {max_force}, max_force_criteria: {max_force_criteria}")
+    return level
+
+
+def reference_precision_params(level, max_force, calculator_kwargs, precision_kwargs):
+    """Return the FHI-aims parameters for a reference at ``level``.
+
+    The ``"tight"`` level returns ``calculator_kwargs`` unchanged.  Looser
+    levels set the SCF thresholds of ``levels[level]`` and
+    ``sc_accuracy_forces`` to ``force_accuracy_fraction * max_force`` (if
+    known), keeping any threshold the user set looser, and scale the
+    ``k_grid`` by ``k_grid_scale[level]``.
+
+    Parameters
+    ----------
+    level : str
+        ``"loose"``, ``"medium"`` or ``"tight"``.
+    max_force : float or None
+        Maximum reference force (eV/AA) of the last iteration.
+    calculator_kwargs : dict
+        User FHI-aims parameters (the ``"tight"`` settings).
+    precision_kwargs : dict
+        Overrides of ``REFERENCE_PRECISION_DEFAULT``.
+
+    Returns
+    -------
+    dict
+        FHI-aims parameters for ``StaticSetGenerator``.
+    """
+
+    settings = _precision_settings(precision_kwargs)
+    params = dict(calculator_kwargs)
+    if level == "tight":
+        return params
+    thresholds = dict(settings["levels"][level])
+    if max_force is not None:
+        thresholds["sc_accuracy_forces"] = settings["force_accuracy_fraction"] * max_force
+    for key, value in thresholds.items():
+        # A level only loosens: keep the user's value where it is looser.
+        user_value = params.get(key)
+        if isinstance(user_value, (int, float)) and isinstance(value, (int, float)):
+            value = max(value, user_value)
+        params[key] = value
+    k_grid_scale = settings["k_grid_scale"].get(level, 1.0)
+    if "k_grid" in params and k_grid_scale != 1.0:
+        params["k_grid"] = [max(1, int(np.ceil(k * k_grid_scale))) for k in params["k_grid"]]
+    logging.info(f"Reference precision {level} parameters: {params}")
+    return params
+
+
+def precision_weight(level, precision_kwargs):
+    """Training weight of a reference at ``level`` (``None`` if untagged)."""
+
+    if level is None:
+        return None
+    settings = _precision_settings(precision_kwargs)
+    return settings["weights"][level]
@@ -0,0 +1,185 @@
+"""
+Symmetry helpers for the GAIMS active-learning loop.
+
+The symmetry of the *input* configuration is detected once
+(``detect_symmetry``) and stored as a plain, serialisable ``dict`` so that it
+can be carried through every recursive ``check_convergence_and_next`` call:
+
+* ``rotations`` - Cartesian rotation matrices of the operations.
+* ``translations`` - Cartesian translations (zero for molecules, whose
+  operations act about the centre of mass).
+* ``permutations`` - ``permutations[k][i]`` is the atom that atom ``i`` is
+  mapped onto by operation ``k``.
+* ``symbol`` - Schoenflies (molecules) or Hermann-Mauguin (crystals) symbol.
+
+Geometries and force fields are symmetrised by averaging over the group, which
+removes the numerical noise that otherwise breaks the symmetry during the
+loop.
+"""
+
+
+import logging
+import numpy as np
+from pymatgen.core import Molecule, Structure
+from pymatgen.symmetry.analyzer import PointGroupAnalyzer, SpacegroupAnalyzer
+
+
+def _map_atoms(positions, mapped, species, lattice, tolerance, mapped_species=None):
+    """Return the permutation taking atom ``i`` onto the atom at ``mapped[i]``.
+
+    ``lattice`` is ``None`` for molecules; otherwise distances use the
+    minimum-image convention.  ``None`` is returned if no consistent mapping
+    exists within ``tolerance`` (AA).  ``mapped_species`` defaults to
+    ``species``.
+    """
+
+    if mapped_species is None:
+        mapped_species = species
+    permutation = []
+    for i, position in enumerate(mapped):
+        difference = positions - position
+        if lattice is not None:
+            frac_difference = lattice.get_fractional_coords(difference)
+            difference = lattice.get_cartesian_coords(frac_difference - np.round(frac_difference))
+        distance = np.linalg.norm(difference, axis=1)
+        distance[[s != mapped_species[i] for s in species]] = np.inf
+        j = int(np.argmin(distance))
+        if distance[j] > tolerance:
+            return None
+        permutation.append(j)
+    if len(set(permutation)) != len(permutation):
+        return None
+    return permutation
+
+
+def detect_symmetry(mol_or_struct, symprec=0.01, tolerance=0.3):
+    """Detect the point / space group of ``mol_or_struct``.
+
+    Parameters
+    ----------
+    mol_or_struct : Structure or Molecule
+        Input configuration.
+    symprec : float
+        ``SpacegroupAnalyzer`` tolerance for periodic structures (AA).  Only
+        operations compatible with the ``selective_dynamics`` constraints are
+        kept.
+    tolerance : float
+        ``PointGroupAnalyzer`` tolerance for molecules (AA).
+
+    Returns
+    -------
+    dict
+        Serialisable symmetry description (see module docstring).
+    """
+
+    species = [str(specie) for specie in mol_or_struct.species]
+    # Constrained atoms may only be mapped onto equally constrained atoms.
+    flags = [str(flag) for flag in mol_or_struct.site_properties.get("selective_dynamics", [None] * len(species))]
+    species = [f"{specie}:{flag}" for specie, flag in zip(species, flags)]
+    rotations, translations, permutations = [], [], []
+    if isinstance(mol_or_struct, Structure):
+        analyzer = SpacegroupAnalyzer(mol_or_struct, symprec=symprec)
+        symbol = analyzer.get_space_group_symbol()
+        positions = mol_or_struct.cart_coords
+        for operation in analyzer.get_symmetry_operations(cartesian=True):
+            mapped = operation.operate_multi(positions)
+            permutation = _map_atoms(positions, mapped, species, mol_or_struct.lattice, 10 * symprec)
+            if permutation is None:
+                continue
+            rotations.append(operation.rotation_matrix.tolist())
+            translations.append(operation.translation_vector.tolist())
+            permutations.append(permutation)
+    else:
+        analyzer = PointGroupAnalyzer(mol_or_struct, tolerance=tolerance)
+        symbol = analyzer.sch_symbol
+        centered = mol_or_struct.cart_coords - mol_or_struct.center_of_mass
+        for operation in analyzer.get_symmetry_operations():
+            permutation = _map_atoms(centered, operation.operate_multi(centered), species, None, tolerance)
+            if permutation is None:
+                continue
+            rotations.append(operation.rotation_matrix.tolist())
+            translations.append([0.0, 0.0, 0.0])
+            permutations.append(permutation)
+    logging.info(f"Detected symmetry {symbol} with {len(rotations)} operations.")
+    return {"rotations": rotations, "translations": translations, "permutations": permutations, "symbol": symbol}
+
+
+def symmetrize_vectors(symmetry, vectors):
+    """Project per-atom vectors (e.g. forces) onto the symmetric subspace."""
+
+    vectors = np.asarray(vectors, dtype=float)
+    symmetric = np.zeros_like(vectors)
+    for rotation, permutation in zip(symmetry["rotations"], symmetry["permutations"]):
+        symmetric[permutation] += vectors @ np.asarray(rotation).T
+    return symmetric / len(symmetry["rotations"])
+
+
+def symmetrize_positions(symmetry, mol_or_struct):
+    """Return Cartesian positions averaged over the symmetry operations."""
+
+    positions = mol_or_struct.cart_coords
+    symmetric = np.zeros_like(positions)
+    if isinstance(mol_or_struct, Structure):
+        lattice = mol_or_struct.lattice
+        for rotation, translation, permutation in zip(
+            symmetry["rotations"], symmetry["translations"], symmetry["permutations"]
+        ):
+            mapped = positions @ np.asarray(rotation).T + np.asarray(translation)
+            # Bring each image next to the atom it is mapped onto.
+            shift = np.round(lattice.get_fractional_coords(positions[permutation] - mapped))
+            symmetric[permutation] += mapped + lattice.get_cartesian_coords(shift)
+    else:
+        center = mol_or_struct.center_of_mass
+        for rotation, permutation in zip(symmetry["rotations"], symmetry["permutations"]):
+            symmetric[permutation] += (positions - center) @ np.asarray(rotation).T + center
+    return symmetric / len(symmetry["rotations"])
+
+
+def with_positions(mol_or_struct, positions):
+    """Copy ``mol_or_struct`` with new Cartesian positions, keeping properties."""
+
+    if isinstance(mol_or_struct, Structure):
+        return Structure(
+            mol_or_struct.lattice,
+            mol_or_struct.species,
+            positions,
+            coords_are_cartesian=True,
+            site_properties=mol_or_struct.site_properties,
+            properties=mol_or_struct.properties,
+        )
+    return Molecule(
+        mol_or_struct.species,
+        positions,
+        charge=mol_or_struct.charge,
+        spin_multiplicity=mol_or_struct.spin_multiplicity,
+        site_properties=mol_or_struct.site_properties,
+        properties=mol_or_struct.properties,
+    )
+
+
+def is_symmetry_equivalent(symmetry, mol_or_struct, other, tolerance=1e-3):
+    """Whether ``other`` is an image of ``mol_or_struct`` under the group.
+
+    Identical atoms may be relabelled, so the images are compared as sets of
+    species-resolved positions within ``tolerance`` (AA).
+    """
+
+    if len(mol_or_struct) != len(other):
+        return False
+    species = [str(specie) for specie in mol_or_struct.species]
+    if sorted(species) != sorted(str(specie) for specie in other.species):
+        return False
+    if isinstance(mol_or_struct, Structure):
+        lattice = mol_or_struct.lattice
+        positions = mol_or_struct.cart_coords
+        other_positions = other.cart_coords
+    else:
+        lattice = None
+        positions = mol_or_struct.cart_coords - mol_or_struct.center_of_mass
+        other_positions = other.cart_coords - other.center_of_mass
+    other_species = [str(specie) for specie in other.species]
+    for rotation, translation in zip(symmetry["rotations"], symmetry["translations"]):
+        mapped = positions @ np.asarray(rotation).T + np.asarray(translation)
+        if _map_atoms(other_positions, mapped, other_species, lattice, tolerance, mapped_species=species) is not None:
+            return True
+    return False
@@ -0,0 +1,115 @@
+import collections
+import logging
+
+import pytest
+from ase.cluster import Icosahedron
+from jobflow import Job, run_locally
+from pymatgen.core import Molecule
+
+from gaims_geoopt.flows import MLIPAssistedGeoOptMaker
+from gaims_geoopt.jobs import STAGES
+from gaims_geoopt.symmetry import detect_symmetry, symmetrize_positions
+
+MAX_FORCE_CRITERIA = 0.05
+
+
+def rattled_cluster():
+    cluster = Icosahedron("Cu", noshells=2)
+    cluster.rattle(stdev=0.05, seed=42)
+    return Molecule.from_ase_atoms(cluster)
+
+
+def run_standin_loop(molecule, **kwargs):
+    """Run the EMT / harmonic loop and return the responses and the flows of all iterations."""
+    flow = MLIPAssistedGeoOptMaker().make(
+        molecule, {"train.extxyz": [], "test.extxyz": []}, MAX_FORCE_CRITERIA, calculator="EMT", mlip="harmonic", **kwargs
+    )
+    responses = run_locally(flow, create_folders=False, log=False, ensure_success=True)
+    flows = []
+    while flow is not None:
+        flows.append(flow)
+        uuid_next = next(job.uuid for job in flow if job.name == "check_convergence_and_next")
+        flow = responses[uuid_next][1].replace
+    return responses, flows
+
+
+def max_forces(responses, flows):
+    return [responses[job.uuid][1].output for flow in flows for job in flow if job.name == "evaluate_max_force"]
+
+
+def test_standin_loop_converges(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responses, flows = run_standin_loop(rattled_cluster())
+
+    forces = max_forces(responses, flows)
+    assert forces[0] > MAX_FORCE_CRITERIA
+    assert forces[-1] < MAX_FORCE_CRITERIA
+    assert len(forces) == 15
+
+
+def test_gdiis_cuts_iterations(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    responses, flows = run_standin_loop(rattled_cluster(), gdiis_kwargs={"curvature": 10.0})
+
+    forces = max_forces(responses, flows)
+    assert forces[-1] < MAX_FORCE_CRITERIA
+    assert len(forces) < 15
+
+
+def test_stage_routing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    workers = collections.defaultdict(set)
+    job_run = Job.run
+
+    def recording_run(self, *args, **kwargs):
+        workers[self.name].add(self.config.manager_config.get("worker"))
+        return job_run(self, *args, **kwargs)
+
+    monkeypatch.setattr(Job, "run", recording_run)
+    run_standin_loop(rattled_cluster(), stage_configs={stage: {"worker": f"{stage}_worker"} for stage in STAGES})
+
+    assert dict(workers) == {
+        "EMT static": {"reference_worker"},
+        "fit_harmonic_surrogate": {"fit_worker"},
+        "get_surrogate_relax_job": {"relax_worker"},
+        "Harmonic surrogate relax": {"relax_worker"},
+        "extract_mol_or_structure": {"bookkeeping_worker"},
+        "evaluate_max_force": {"bookkeeping_worker"},
+        "add_structure_database": {"bookkeeping_worker"},
+        "check_convergence_and_next": {"bookkeeping_worker"},
+    }
+
+
+@pytest.mark.parametrize("optimizer_kwargs", [{"optimizer": "BFGS", "warm_start": True}, {"optimizer": "LBFGS", "warm_start": True}])
+def test_standin_loop_warm_start(tmp_path, monkeypatch, caplog, optimizer_kwargs):
+    monkeypatch.chdir(tmp_path)
+    caplog.set_level(logging.INFO)
+    responses, flows = run_standin_loop(rattled_cluster(), optimizer_kwargs=optimizer_kwargs)
+
+    assert max_forces(responses, flows)[-1] < MAX_FORCE_CRITERIA
+    assert f"Warm-starting {optimizer_kwargs['optimizer']}" in caplog.text
+
+
+def test_warm_start_rejected_for_fire():
+    with pytest.raises(ValueError, match="Warm start is not supported"):
+        MLIPAssistedGeoOptMaker().make(
+            rattled_cluster(),
+            {"train.extxyz": [], "test.extxyz": []},
+            MAX_FORCE_CRITERIA,
+            calculator="EMT",
+            mlip="harmonic",
+            optimizer_kwargs={"optimizer": "FIRE", "warm_start": True},
+        )
+
+
+def test_standin_loop_keeps_symmetry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cluster = Icosahedron("Cu", noshells=2, latticeconstant=3.8)
+    responses, flows = run_standin_loop(Molecule.from_ase_atoms(cluster), symmetry_kwargs={})
+
+    assert max_forces(responses, flows)[-1] < MAX_FORCE_CRITERIA
+    database_dict = [responses[job.uuid][1].output for job in flows[-1] if job.name == "add_structure_database"][-1]
+    final = database_dict["train.extxyz"][-1]
+    symmetry = detect_symmetry(Molecule.from_ase_atoms(cluster))
+    assert symmetry["symbol"] == "Ih"
+    assert symmetrize_positions(symmetry, final) == pytest.approx(final.cart_coords, abs=1e-8)
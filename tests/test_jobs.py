@@ -0,0 +1,95 @@
+import logging
+
+import numpy as np
+import pytest
+from ase.cluster import Icosahedron
+from pymatgen.core import Molecule
+
+from gaims_geoopt.jobs import (
+    OPTIMIZER_STATE_FILE,
+    SurrogateRelaxMaker,
+    gdiis_extrapolate,
+    get_optimizer_class,
+    secant_hessian,
+)
+
+
+@pytest.fixture
+def molecule():
+    cluster = Icosahedron("Cu", noshells=2)
+    cluster.rattle(stdev=0.05, seed=42)
+    return Molecule.from_ase_atoms(cluster)
+
+
+def surrogate_maker(molecule, curvature, shift=0.05, **kwargs):
+    """Relax maker on a harmonic well with its minimum at ``molecule`` shifted by ``shift``."""
+    positions = molecule.cart_coords
+    return SurrogateRelaxMaker(
+        steps=200,
+        calculator_kwargs={
+            "anchor_positions": positions.tolist(),
+            "anchor_forces": (curvature * shift * np.ones_like(positions)).tolist(),
+            "curvature": curvature,
+        },
+        relax_kwargs={"fmax": 1e-4},
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("optimizer", ["BFGS", "LBFGS"])
+def test_warm_start_from_previous_state(tmp_path, monkeypatch, caplog, molecule, optimizer):
+    caplog.set_level(logging.INFO)
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second"
+    first_dir.mkdir()
+    second_dir.mkdir()
+
+    monkeypatch.chdir(first_dir)
+    cold = surrogate_maker(molecule, 10.0, optimizer=optimizer, warm_start=True).run_ase(molecule, prev_dir=None)
+    assert (first_dir / OPTIMIZER_STATE_FILE).is_file()
+    assert "Warm-starting" not in caplog.text
+
+    monkeypatch.chdir(second_dir)
+    warm = surrogate_maker(molecule, 12.0, optimizer=optimizer, warm_start=True).run_ase(molecule, prev_dir=first_dir)
+    assert f"Warm-starting {optimizer}" in caplog.text
+    assert np.max(np.abs(warm.final_mol_or_struct.cart_coords - molecule.cart_coords - 0.05)) < 1e-3
+    assert np.max(np.abs(cold.final_mol_or_struct.cart_coords - molecule.cart_coords - 0.05)) < 1e-3
+
+
+def test_stale_state_file_is_ignored(tmp_path, monkeypatch, molecule):
+    monkeypatch.chdir(tmp_path)
+    # State of a different (smaller) system left behind in a shared directory.
+    (tmp_path / OPTIMIZER_STATE_FILE).write_text('[{"__ndarray__": [[3, 3], "float64", [1, 0, 0, 0, 1, 0, 0, 0, 1]]}, null, null, 0.2]')
+
+    result = surrogate_maker(molecule, 10.0).run_ase(molecule, prev_dir=None)
+    assert np.max(np.abs(result.final_mol_or_struct.cart_coords - molecule.cart_coords - 0.05)) < 1e-3
+
+
+@pytest.mark.parametrize("optimizer", ["FIRE", "PreconLBFGS", "PreconFIRE"])
+def test_warm_start_unsupported(optimizer):
+    assert get_optimizer_class(optimizer).__name__ == optimizer
+    with pytest.raises(ValueError, match="Warm start is not supported"):
+        get_optimizer_class(optimizer, warm_start=True)
+
+
+def test_gdiis_extrapolate_quadratic():
+    # On a quadratic surface with the exact curvature GDIIS lands on the minimum.
+    rng = np.random.default_rng(0)
+    minimum = rng.normal(size=(4, 3))
+    positions = minimum + rng.normal(scale=0.1, size=(3, 4, 3))
+    forces = -5.0 * (positions - minimum)
+
+    assert gdiis_extrapolate(positions, forces, curvature=5.0) == pytest.approx(minimum)
+    assert gdiis_extrapolate(positions[:1], forces[:1]) is None
+
+
+def test_secant_hessian_recovers_curvature():
+    rng = np.random.default_rng(1)
+    hessian = np.diag([2.0, 5.0, 20.0])
+    positions = rng.normal(size=(6, 1, 3))
+    forces = -positions @ hessian
+
+    estimate = secant_hessian(positions, forces, curvature=70.0)
+    step = (positions[-1] - positions[-2]).ravel()
+    assert estimate @ step == pytest.approx(hessian @ step)
+    assert np.all(np.linalg.eigvalsh(estimate) > 0)
@@ -0,0 +1,57 @@
+import pytest
+
+from gaims_geoopt.schedules import (
+    adaptive_budgets,
+    epochs_for_batch_size,
+    precision_weight,
+    reference_precision_level,
+    reference_precision_params,
+)
+
+
+def test_epochs_for_batch_size_keeps_updates():
+    assert epochs_for_batch_size(500, 10, 1) == 500
+    assert epochs_for_batch_size(500, 10, 8) == 2500
+    assert epochs_for_batch_size(500, 1, 8) == 500
+
+
+def test_adaptive_budgets_reach_fixed_budget_near_convergence():
+    far = adaptive_budgets(5.0, 0.05, None, 10, {})
+    near = adaptive_budgets(0.1, 0.05, None, 10, {})
+    unresolved = adaptive_budgets(0.1, 0.05, 0.2, 10, {})
+
+    assert far["max_num_epochs"] < 500 <= near["max_num_epochs"]
+    assert unresolved["max_num_epochs"] == 2 * near["max_num_epochs"]
+    assert near["patience"] == near["max_num_epochs"]
+    assert adaptive_budgets(0.1, 0.05, None, 10, {}, batch_size=8)["max_num_epochs"] == 5 * near["max_num_epochs"]
+    assert 0.005 <= adaptive_budgets(0.1, 0.05, 0.02, 10, {})["fmax"] <= 0.05
+
+
+def test_reference_precision_level():
+    assert reference_precision_level(None, 0.05, {}) == "loose"
+    assert reference_precision_level(1.0, 0.05, {}) == "loose"
+    assert reference_precision_level(0.2, 0.05, {}) == "medium"
+    assert reference_precision_level(0.1, 0.05, {}) == "tight"
+
+
+def test_precision_settings_merge_key_by_key():
+    precision_kwargs = {"weights": {"loose": 0.3}, "k_grid_scale": {"loose": 0.5}, "levels": {"loose": {"sc_accuracy_eev": 5e-2}}}
+
+    assert precision_weight("loose", precision_kwargs) == 0.3
+    assert precision_weight("medium", precision_kwargs) == 0.8
+    params = reference_precision_params("loose", None, {"k_grid": [4, 4, 4]}, precision_kwargs)
+    assert params["k_grid"] == [2, 2, 2]
+    assert params["sc_accuracy_eev"] == 5e-2
+    assert params["sc_accuracy_rho"] == 1e-4
+    assert reference_precision_params("medium", None, {"k_grid": [4, 4, 4]}, precision_kwargs)["k_grid"] == [4, 4, 4]
+
+
+def test_precision_never_tightens_user_thresholds():
+    calculator_kwargs = {"sc_accuracy_rho": 1e-3, "sc_accuracy_etot": 1e-6, "sc_accuracy_forces": 0.1}
+
+    params = reference_precision_params("loose", 1.0, calculator_kwargs, {})
+    assert params["sc_accuracy_rho"] == 1e-3
+    assert params["sc_accuracy_etot"] == 1e-4
+    assert params["sc_accuracy_forces"] == 0.1
+    assert reference_precision_params("tight", 1.0, calculator_kwargs, {}) == calculator_kwargs
+    assert reference_precision_params("medium", 1.0, {}, {})["sc_accuracy_forces"] == pytest.approx(0.01)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from pymatgen.core import Lattice, Molecule, Structure
+
+from gaims_geoopt.symmetry import (
+    detect_symmetry,
+    is_symmetry_equivalent,
+    symmetrize_positions,
+    symmetrize_vectors,
+    with_positions,
+)
+
+
+@pytest.fixture
+def methane():
+    d = 0.63
+    return Molecule(["C", "H", "H", "H", "H"], [[0, 0, 0], [d, d, d], [-d, -d, d], [-d, d, -d], [d, -d, -d]])
+
+
+@pytest.fixture
+def bcc_iron():
+    return Structure.from_spacegroup("Im-3m", Lattice.cubic(2.87), ["Fe"], [[0, 0, 0]])
+
+
+def test_detect_symmetry_methane(methane):
+    symmetry = detect_symmetry(methane)
+
+    assert symmetry["symbol"] == "Td"
+    assert len(symmetry["rotations"]) == 24
+    assert all(sorted(permutation) == list(range(5)) for permutation in symmetry["permutations"])
+
+
+@pytest.mark.parametrize("mol_or_struct", ["methane", "bcc_iron"])
+def test_symmetrize_positions_removes_noise(request, mol_or_struct):
+    mol_or_struct = request.getfixturevalue(mol_or_struct)
+    symmetry = detect_symmetry(mol_or_struct)
+    rng = np.random.default_rng(0)
+    noisy = with_positions(mol_or_struct, mol_or_struct.cart_coords + rng.normal(scale=1e-3, size=(len(mol_or_struct), 3)))
+
+    symmetric = with_positions(noisy, symmetrize_positions(symmetry, noisy))
+    # The projection is idempotent and keeps the configuration in the group.
+    assert symmetrize_positions(symmetry, symmetric) == pytest.approx(symmetric.cart_coords, abs=1e-10)
+    assert detect_symmetry(symmetric)["symbol"] == symmetry["symbol"]
+
+
+def test_symmetrize_vectors_projection(methane):
+    symmetry = detect_symmetry(methane)
+    rng = np.random.default_rng(1)
+    forces = rng.normal(size=(5, 3))
+
+    symmetric = symmetrize_vectors(symmetry, forces)
+    assert symmetrize_vectors(symmetry, symmetric) == pytest.approx(symmetric)
+    # Td admits no force on the central atom and no net force.
+    assert symmetric[0] == pytest.approx(np.zeros(3))
+    assert symmetric.sum(axis=0) == pytest.approx(np.zeros(3))
+
+
+def test_is_symmetry_equivalent(methane):
+    symmetry = detect_symmetry(methane)
+    rotated = with_positions(methane, methane.cart_coords @ np.asarray(symmetry["rotations"][5]).T)
+    distorted = with_positions(methane, methane.cart_coords + [[0, 0, 0], [0.1, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]])
+
+    assert is_symmetry_equivalent(symmetry, methane, rotated)
+    assert not is_symmetry_equivalent(symmetry, methane, distorted)